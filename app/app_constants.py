@@ -21,3 +21,25 @@ URL_LABEL = "Jama Connect URL:"
 AUTH_MODE_LABEL = "Authentication mode:"
 BASIC_AUTH_LABEL = "Basic"
 OAUTH_LABEL = "OAuth"
+TELEMETRY_PANEL_LABEL = "Telemetry"
+TELEMETRY_MENU_LABEL = "Show telemetry"
+CASSETTE_MENU_LABEL = "Cassette"
+CASSETTE_OFF_LABEL = "Off (live server)"
+CASSETTE_RECORD_LABEL = "Record..."
+CASSETTE_REPLAY_LABEL = "Replay..."
+CASSETTE_REPLAY_LATENCY_LABEL = "Replay with recorded latency"
+SEARCH_LABEL = "Search:"
+SEARCH_REGEX_LABEL = "Regex"
+SEARCH_MATCH_CASE_LABEL = "Match case"
+SEARCH_LEVEL_LABEL = "Level:"
+SEARCH_TAG_LABEL = "Tag:"
+SEARCH_BUTTON_TEXT = "Find"
+SEARCH_PREVIOUS_BUTTON_TEXT = "<"
+SEARCH_NEXT_BUTTON_TEXT = ">"
+SEARCH_FILTER_LABEL = "Show matches only"
+RUN_HISTORY_MENU_LABEL = "Run history"
+RUN_HISTORY_TITLE = "Run history"
+RUN_HISTORY_REFRESH_BUTTON_TEXT = "Refresh"
+
+# Run history database file, next to the settings file
+RUN_HISTORY_FILE = "run_history.sqlite3"
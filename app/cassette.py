@@ -0,0 +1,166 @@
+import base64
+import collections
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
+
+import requests
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+
+import client_session
+
+"""
+This file contains a record / replay mode for the HTTP traffic of a JamaClient.  In record mode every request and
+response is appended to a gzip compressed JSON Lines cassette file.  In replay mode the responses are served from the
+cassette without touching the network, so a script can be re-run quickly and repeatably while it is being developed.
+"""
+
+RECORD_MODE = "record"
+REPLAY_MODE = "replay"
+
+CASSETTE_FORMAT_VERSION = 1
+
+# Response headers that are not recorded.
+UNRECORDED_HEADERS = {'set-cookie', 'content-encoding', 'transfer-encoding'}
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """Raised in replay mode when a request was not recorded in the cassette."""
+    pass
+
+
+class Cassette:
+    """
+    Records or replays the requests sent by the clients it is installed on.  Request headers, including credentials,
+    are never recorded.
+    """
+
+    def __init__(self, path, mode, replay_latency=False):
+        """
+        :param path: The cassette file.
+        :param mode: RECORD_MODE or REPLAY_MODE
+        :param replay_latency: In replay mode, wait the recorded time before returning each response.
+        """
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._file = None
+        self._recorded = {}
+
+        if mode == RECORD_MODE:
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+            self._file.write(json.dumps({"version": CASSETTE_FORMAT_VERSION}) + "\n")
+        elif mode == REPLAY_MODE:
+            self.__load()
+        else:
+            raise ValueError("Unknown cassette mode: {}".format(mode))
+
+    def install(self, client):
+        """
+        Record or replay the requests sent by the client.
+        :param client: The JamaClient
+        :return: None
+        """
+        if self.mode == RECORD_MODE:
+            client_session.wrap_send(client, self.__record_send)
+        else:
+            # Each client reads the cassette from the start, so every run replays the same responses.
+            positions = collections.Counter()
+            client_session.wrap_send(client, lambda send, request, **kwargs: self.__replay_send(positions, send,
+                                                                                                request, **kwargs))
+
+    def flush(self):
+        """Write the recorded requests to disk. The cassette can be replayed after a flush."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def request_key(method, url, body):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        return "{} {} {}".format(method, url, hashlib.sha1(body or b'').hexdigest())
+
+    def __record_send(self, send, request, **kwargs):
+        response = send(request, **kwargs)
+
+        # Reading the content of a streamed response here still lets the caller iterate it.
+        content = response.content or b''
+        try:
+            body = {"text": content.decode('utf-8')}
+        except UnicodeDecodeError:
+            body = {"base64": base64.b64encode(content).decode('ascii')}
+
+        entry = {
+            "key": Cassette.request_key(request.method, request.url, request.body),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items()
+                        if name.lower() not in UNRECORDED_HEADERS},
+            "elapsed": response.elapsed.total_seconds(),
+        }
+        entry.update(body)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps(entry) + "\n")
+        return response
+
+    def __replay_send(self, positions, send, request, **kwargs):
+        """
+        :param positions: The client's read position in the recorded responses of each request key.  The recorded
+            responses themselves are never modified.
+        """
+        key = Cassette.request_key(request.method, request.url, request.body)
+        entries = self._recorded.get(key)
+        if not entries:
+            raise CassetteMissError("Request not found in cassette {}: {} {}".format(self.path, request.method,
+                                                                                   request.url))
+        with self._lock:
+            # Repeated requests are answered in the order they were recorded; the last answer is then reused.
+            entry = entries[min(positions[key], len(entries) - 1)]
+            positions[key] += 1
+
+        if self.replay_latency:
+            time.sleep(entry.get("elapsed", 0))
+
+        response = requests.Response()
+        response.status_code = entry.get("status")
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        if "base64" in entry:
+            response._content = base64.b64decode(entry.get("base64"))
+        else:
+            response._content = entry.get("text", "").encode('utf-8')
+        # Mark the content as already read so that streamed iteration and close() work without a connection.
+        response._content_consumed = True
+        response.raw = io.BytesIO(response._content)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=entry.get("elapsed", 0))
+        return dispatch_hook('response', request.hooks, response, **kwargs)
+
+    def __load(self):
+        recorded = collections.defaultdict(list)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as cassette_file:
+            try:
+                for line in cassette_file:
+                    entry = json.loads(line)
+                    if "key" in entry:
+                        recorded[entry.get("key")].append(entry)
+            except (EOFError, ValueError):
+                # A cassette that was flushed but not closed ends with an incomplete gzip member or line.
+                pass
+        self._recorded = recorded
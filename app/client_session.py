@@ -0,0 +1,37 @@
+"""
+This file contains helpers to reach the HTTP layer underneath a JamaClient, so that the runner can extend how requests
+are sent and responses are decoded without changing the client library.
+"""
+
+
+def get_core(client):
+    """Returns the py_jama_rest_client Core used by a JamaClient."""
+    return client._JamaClient__core
+
+
+def get_session(client):
+    """Returns the requests.Session used by a JamaClient."""
+    return get_core(client)._Core__session
+
+
+def add_response_hook(client, hook):
+    """
+    Register a function to be called with every response received by the client.
+    :param client: The JamaClient
+    :param hook: A function taking (response, *args, **kwargs) as described by the requests library.
+    :return: None
+    """
+    get_session(client).hooks['response'].append(hook)
+
+
+def wrap_send(client, wrapper):
+    """
+    Wrap the function the client uses to send every request.
+    :param client: The JamaClient
+    :param wrapper: A function taking (send, request, **kwargs) that must call send(request, **kwargs), or return a
+        requests.Response of its own.
+    :return: None
+    """
+    session = get_session(client)
+    send = session.send
+    session.send = lambda request, **kwargs: wrapper(send, request, **kwargs)
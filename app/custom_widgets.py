@@ -1,9 +1,12 @@
+import threading
 import tkinter as tk
 from tkinter import ttk
 import tkinter.constants as tkc
 from tkinter import filedialog
 
 import colors
+from input_reader import InputFileReader
+from option_index import OptionIndex
 
 """
 This file contains a collection of custom widgets to collect data from user.
@@ -40,6 +43,13 @@ class FieldWidget(tk.Frame):
     def set_value(self, value):
         pass
 
+    def get_param(self):
+        """
+        Returns the value passed to the script for this field.  By default this is the same as get_value(), which is
+        the value saved to the settings file.
+        """
+        return self.get_value()
+
 
 class StringFieldWidget(FieldWidget):
     """
@@ -113,6 +123,104 @@ class FileChooserFieldWidget(StringFieldWidget):
             self.set_value(file)
 
 
+class InputFileFieldWidget(FileChooserFieldWidget):
+    """
+    This class represents a File chooser field whose file is read by the runner.  The row count of the chosen file is
+    shown next to the field, and the script is passed an InputFileReader instead of the path.
+    """
+
+    # Number of rows shown in the preview window
+    PREVIEW_ROWS = 50
+
+    def __init__(self, master, label_text, reader_options=None):
+        """
+        :param master: The Parent Widget
+        :param label_text: The Initial text for the label.
+        :param reader_options: Optional dict of keyword arguments for the InputFileReader. i.e. column_types
+        """
+        # Init parent
+        FileChooserFieldWidget.__init__(self, master, label_text)
+        self.reader_options = reader_options or {}
+
+        # Add a button to preview the first rows of the file
+        self.preview_button = ttk.Button(self, text="Preview", command=self.show_preview)
+
+        # Add a label to display the row count
+        self.summary_string_var = tk.StringVar(self, "")
+        self.summary_label = ttk.Label(self, textvariable=self.summary_string_var, background=colors.JAMA_HILO_SILVER)
+
+        # Pack it
+        self.preview_button.pack(side=tkc.LEFT)
+        self.summary_label.pack(side=tkc.LEFT)
+
+        # Recount rows whenever the path changes. The count is done on a background thread.
+        self.summary = None
+        self.value.trace_add('write', lambda *args: self.update_summary())
+
+    def get_reader(self):
+        path = self.get_value().strip()
+        if path == '':
+            return None
+        return InputFileReader(path, **self.reader_options)
+
+    def get_param(self):
+        return self.get_reader()
+
+    def update_summary(self):
+        reader = self.get_reader()
+        if reader is None:
+            self.summary_string_var.set("")
+            return
+        self.summary_string_var.set("Counting rows...")
+        self.summary = None
+        threading.Thread(target=self.__count_rows, args=(reader,), daemon=True).start()
+        self.after(100, self.__periodic_check_summary, reader.path)
+
+    def __count_rows(self, reader):
+        try:
+            self.summary = (reader.path, "{:,} rows".format(reader.count_rows()))
+        except Exception as e:
+            self.summary = (reader.path, "Unable to read file: {}".format(e))
+
+    def __periodic_check_summary(self, path):
+        # Ignore results for a path that is no longer selected.
+        if self.get_value().strip() != path:
+            return
+        if self.summary is None or self.summary[0] != path:
+            self.after(100, self.__periodic_check_summary, path)
+            return
+        self.summary_string_var.set(self.summary[1])
+
+    def show_preview(self):
+        reader = self.get_reader()
+        if reader is None:
+            return
+        try:
+            rows = reader.preview(InputFileFieldWidget.PREVIEW_ROWS)
+        except Exception as e:
+            self.summary_string_var.set("Unable to read file: {}".format(e))
+            return
+
+        # Columns are the union of the keys of the preview rows, in order of first appearance.
+        columns = []
+        for row in rows:
+            for column in row.keys():
+                if column not in columns:
+                    columns.append(column)
+
+        preview_window = tk.Toplevel(self)
+        preview_window.title(reader.path)
+        tree = ttk.Treeview(preview_window, columns=columns, show="headings")
+        for column in columns:
+            tree.heading(column, text=column)
+        for row in rows:
+            tree.insert('', tkc.END, values=[str(row.get(column, '')) for column in columns])
+        x_scrollbar = ttk.Scrollbar(preview_window, orient=tkc.HORIZONTAL, command=tree.xview)
+        tree.configure(xscrollcommand=x_scrollbar.set)
+        x_scrollbar.pack(side=tkc.BOTTOM, fill=tkc.X)
+        tree.pack(fill=tkc.BOTH, expand=tkc.TRUE)
+
+
 class RadioButtonFieldWidget(FieldWidget):
     """
     This Class will create a group of radio buttons for the form
@@ -185,3 +293,127 @@ class ComboBoxFieldWidget(FieldWidget):
         except ValueError:
             pass
 
+
+class ServerComboBoxFieldWidget(FieldWidget):
+    """
+    Allows the user to select an option from a combobox dropdown whose options are loaded from the Jama server.  The
+    options are loaded in the background once per connection, and typing in the combobox filters them.
+    """
+
+    # Maximum number of options shown in the dropdown at once
+    MAX_SHOWN_OPTIONS = 200
+
+    def __init__(self, master, label_text, options_loader):
+        """
+        Builds a combo box input chooser.
+        :param master: The owning component.
+        :param label_text: The Field Label
+        :param options_loader: A function that takes the metadata snapshot of the connection and returns a list of
+            options.  Each option is either a label string or a (label, value) tuple.
+        :return:
+        """
+        # Init the field widget
+        FieldWidget.__init__(self, master, label_text)
+        self.value = tk.StringVar()
+        self.options_loader = options_loader
+
+        # Loaded options and load errors, by connection key.
+        self.option_indexes = {}
+        self.load_errors = {}
+        self.connection_key = None
+
+        self.combo_box = ttk.Combobox(self,
+                                      textvariable=self.value,
+                                      background=colors.JAMA_HILO_SILVER,
+                                      width=30,
+                                      postcommand=self.filter_options)
+        self.combo_box.bind('<KeyRelease>', lambda e: self.filter_options())
+
+        # Add a label to display the loading status
+        self.status_string_var = tk.StringVar(self, "")
+        self.status_label = ttk.Label(self, textvariable=self.status_string_var, background=colors.JAMA_HILO_SILVER)
+
+        self.combo_box.pack(side=tkc.LEFT)
+        self.status_label.pack(side=tkc.LEFT)
+
+    def load_options(self, metadata):
+        """
+        Load the options for a connection in the background, unless they are already cached.
+        :param metadata: The MetadataSnapshot of the connection.
+        :return: None
+        """
+        connection_key = metadata.connection_key
+        if connection_key == self.connection_key and connection_key not in self.load_errors:
+            return
+        self.connection_key = connection_key
+        self.load_errors.pop(connection_key, None)
+
+        if connection_key in self.option_indexes:
+            self.__show_options()
+            return
+
+        self.status_string_var.set("Loading...")
+        threading.Thread(target=self.__load, args=(metadata,), daemon=True).start()
+        self.after(100, self.__periodic_check_loaded, connection_key)
+
+    def __load(self, metadata):
+        try:
+            self.option_indexes[metadata.connection_key] = OptionIndex(self.options_loader(metadata))
+        except Exception as e:
+            self.load_errors[metadata.connection_key] = e
+
+    def __periodic_check_loaded(self, connection_key):
+        # Ignore results for a connection that is no longer current.
+        if connection_key != self.connection_key:
+            return
+        if connection_key in self.option_indexes or connection_key in self.load_errors:
+            self.__show_options()
+        else:
+            self.after(100, self.__periodic_check_loaded, connection_key)
+
+    def __show_options(self):
+        error = self.load_errors.get(self.connection_key)
+        if error is not None:
+            self.status_string_var.set("Unable to load options: {}".format(error))
+        else:
+            self.status_string_var.set("")
+        self.filter_options()
+
+    def filter_options(self):
+        option_index = self.option_indexes.get(self.connection_key)
+        if option_index is None:
+            return
+        self.combo_box.configure(values=option_index.search(self.value.get(),
+                                                            ServerComboBoxFieldWidget.MAX_SHOWN_OPTIONS))
+
+    def get_value(self):
+        return self.value.get()
+
+    def set_value(self, value):
+        try:
+            value = str(value)
+            self.value.set(value)
+        except ValueError:
+            pass
+
+    def get_param(self):
+        """
+        Returns the value of the selected option.  Never waits for the options to load: raises a ValueError, and shows
+        the reason next to the field, if the options are not loaded yet or the entered text is not one of them.
+        """
+        field_name = self.label_string_var.get().rstrip(':')
+        label = self.get_value()
+        option_index = self.option_indexes.get(self.connection_key)
+        if option_index is None:
+            error = self.load_errors.get(self.connection_key)
+            if error is not None:
+                message = "{} options could not be loaded: {}".format(field_name, error)
+            else:
+                message = "{} options are still loading, try again in a moment.".format(field_name)
+            raise ValueError(message)
+        value = option_index.value_of(label)
+        if value is None:
+            message = "'{}' is not one of the options.".format(label)
+            self.status_string_var.set(message)
+            raise ValueError("{} {}".format(field_name, message))
+        return value
@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import queue
+import threading
+
+"""
+This file contains a streaming reader for large input files (CSV, TSV and JSON Lines).  Rows are parsed, coerced and
+validated in chunks on a background thread, so memory use does not depend on the size of the file and parsing can
+overlap with the script's API calls.
+"""
+
+CSV_FORMAT = "csv"
+TSV_FORMAT = "tsv"
+JSONL_FORMAT = "jsonl"
+
+# File extension to file format lookup.
+FILE_FORMATS = {
+    ".csv": CSV_FORMAT,
+    ".tsv": TSV_FORMAT,
+    ".tab": TSV_FORMAT,
+    ".jsonl": JSONL_FORMAT,
+    ".ndjson": JSONL_FORMAT,
+}
+
+# Size of the blocks read when counting rows.
+COUNT_BLOCK_SIZE = 1024 * 1024
+
+
+class InputValidationError(ValueError):
+    """Raised when a row of the input file can not be coerced to the declared column types."""
+
+    def __init__(self, message, row_number=None, column=None):
+        super(InputValidationError, self).__init__(message)
+        self.row_number = row_number
+        self.column = column
+
+
+class InputFileReader:
+    """
+    Reads an input file as a stream of row dicts.
+
+    Iterate the reader to get one row at a time, or call chunks() to get lists of rows.  Each pass over the file
+    starts a new background parsing thread.
+    """
+
+    def __init__(self, path, column_types=None, chunk_size=1000, file_format=None, encoding="utf-8-sig",
+                 skip_invalid=False, prefetch_chunks=4):
+        """
+        :param path: The path to the input file.
+        :param column_types: Optional dict of column name to a function used to coerce that column. i.e. {"id": int}
+            the function should raise a ValueError or TypeError for invalid values.
+        :param chunk_size: The number of rows parsed per chunk.
+        :param file_format: One of CSV_FORMAT, TSV_FORMAT or JSONL_FORMAT. Detected from the file extension if omitted.
+        :param encoding: The file's text encoding.
+        :param skip_invalid: If True rows that fail coercion are skipped and recorded in invalid_rows, otherwise an
+            InputValidationError is raised.
+        :param prefetch_chunks: The number of parsed chunks that may be buffered ahead of the consumer.
+        """
+        self.path = path
+        self.column_types = column_types or {}
+        self.chunk_size = chunk_size
+        self.file_format = file_format or FILE_FORMATS.get(os.path.splitext(path)[1].lower(), CSV_FORMAT)
+        self.encoding = encoding
+        self.skip_invalid = skip_invalid
+        self.prefetch_chunks = prefetch_chunks
+        self.invalid_rows = []
+
+    def __str__(self):
+        return self.path
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            for row in chunk:
+                yield row
+
+    def count_rows(self):
+        """
+        Quickly count the rows in the file by counting line breaks, without parsing.  For CSV/TSV files containing
+        quoted line breaks, or JSON Lines files containing blank lines, this is an upper bound.
+        :return: The number of data rows (excluding the header line).
+        """
+        lines = 0
+        last_block = b''
+        with open(self.path, 'rb') as input_file:
+            block = input_file.read(COUNT_BLOCK_SIZE)
+            while block:
+                lines += block.count(b'\n')
+                last_block = block
+                block = input_file.read(COUNT_BLOCK_SIZE)
+
+        # Count a final line that has no trailing line break.
+        if last_block and not last_block.endswith(b'\n'):
+            lines += 1
+
+        if self.file_format != JSONL_FORMAT and lines > 0:
+            lines -= 1
+        return lines
+
+    def preview(self, rows=20):
+        """
+        Parse the first rows of the file on the calling thread.
+        :param rows: The maximum number of rows to return.
+        :return: A list of row dicts.
+        """
+        preview_rows = []
+        for row in self.__parse_rows(validate=False):
+            if len(preview_rows) >= rows:
+                break
+            preview_rows.append(row)
+        return preview_rows
+
+    def chunks(self):
+        """
+        Generator yielding lists of coerced row dicts.  The rows are parsed on a background thread that stays at most
+        prefetch_chunks ahead of the consumer.
+        """
+        chunk_queue = queue.Queue(maxsize=self.prefetch_chunks)
+        stop = threading.Event()
+        self.invalid_rows = []
+
+        parser_thread = threading.Thread(target=self.__produce_chunks, args=(chunk_queue, stop), daemon=True)
+        parser_thread.start()
+        try:
+            while True:
+                kind, payload = chunk_queue.get()
+                if kind == "chunk":
+                    yield payload
+                elif kind == "error":
+                    raise payload
+                else:
+                    return
+        finally:
+            # If the consumer stopped early let the parser thread exit.
+            stop.set()
+
+    def __produce_chunks(self, chunk_queue, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunk_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            chunk = []
+            for row in self.__parse_rows(validate=True):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    if not put(("chunk", chunk)):
+                        return
+                    chunk = []
+            if chunk and not put(("chunk", chunk)):
+                return
+            put(("done", None))
+        except Exception as e:
+            put(("error", e))
+
+    def __parse_rows(self, validate):
+        if self.file_format == JSONL_FORMAT:
+            rows = self.__read_jsonl()
+        else:
+            rows = self.__read_delimited()
+
+        # The first row of data is row 1; the header of delimited files is not counted.
+        for row_number, row in enumerate(rows, 1):
+            if not validate:
+                yield row
+                continue
+            try:
+                yield self.__coerce(row, row_number)
+            except InputValidationError as e:
+                if not self.skip_invalid:
+                    raise
+                self.invalid_rows.append((row_number, str(e)))
+
+    def __read_delimited(self):
+        delimiter = '\t' if self.file_format == TSV_FORMAT else ','
+        with open(self.path, 'r', newline='', encoding=self.encoding) as input_file:
+            for row in csv.DictReader(input_file, delimiter=delimiter):
+                yield row
+
+    def __read_jsonl(self):
+        with open(self.path, 'r', encoding=self.encoding) as input_file:
+            for line in input_file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def __coerce(self, row, row_number):
+        for column, coerce in self.column_types.items():
+            if column not in row:
+                raise InputValidationError("Row {}: missing column '{}'".format(row_number, column),
+                                           row_number, column)
+            try:
+                row[column] = coerce(row[column])
+            except (ValueError, TypeError) as e:
+                raise InputValidationError("Row {}: invalid value for column '{}': {}".format(row_number, column, e),
+                                           row_number, column)
+        return row
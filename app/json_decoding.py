@@ -0,0 +1,217 @@
+import codecs
+import json
+import sys
+
+import client_session
+
+"""
+This file contains the JSON decoding used for Jama responses.  The decoder is pluggable: a C backed parser is used when
+one is installed, and large listings can be decoded incrementally, one record at a time, as the bytes arrive.
+"""
+
+# Optional fast decoders, in order of preference.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Default size of the blocks read from streamed responses.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Number of records requested per page when streaming listings. (Jama returns at most 50)
+STREAM_PAGE_SIZE = 50
+
+# Whitespace allowed between JSON tokens.
+WHITESPACE = ' \t\n\r'
+
+# Characters that may follow a complete value.
+VALUE_TERMINATORS = WHITESPACE + ',:]}'
+
+
+def _intern_keys(pairs):
+    return {sys.intern(key): value for key, value in pairs}
+
+
+# A stdlib decoder that interns object keys.  The stdlib already shares repeated keys within a single document, but
+# records decoded one at a time by iter_data_records, or kept from many responses, would each hold their own copies of
+# keys such as "fields" and "location".
+_interning_decoder = json.JSONDecoder(object_pairs_hook=_intern_keys)
+
+
+def decode_stdlib(content):
+    return json.loads(content)
+
+
+def decode_stdlib_interned(content):
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode('utf-8')
+    return _interning_decoder.decode(content)
+
+
+# Decoder name: decode function taking the response body as bytes.
+DECODERS = {
+    "json": decode_stdlib,
+    "json-interned": decode_stdlib_interned,
+}
+if ujson is not None:
+    DECODERS["ujson"] = ujson.loads
+if orjson is not None:
+    # orjson caches short keys internally, so keys are already shared between records.
+    DECODERS["orjson"] = orjson.loads
+
+# The decoder installed on new clients.
+default_decoder = DECODERS.get("orjson") or DECODERS.get("ujson") or decode_stdlib
+
+
+def set_default_decoder(decoder):
+    """
+    Choose the decoder installed on new clients.
+    :param decoder: The name of one of the DECODERS, or a function that takes the response body as bytes.
+    :return: None
+    """
+    global default_decoder
+    if not callable(decoder):
+        decoder = DECODERS[decoder]
+    default_decoder = decoder
+
+
+def install_decoder(client, decoder=None):
+    """
+    Make every response received by the client decode its JSON body with the decoder.
+    :param client: The JamaClient
+    :param decoder: A function that takes the response body as bytes. Defaults to default_decoder.
+    :return: None
+    """
+    decoder = decoder or default_decoder
+
+    def use_decoder(response, *args, **kwargs):
+        # Streamed responses are decoded incrementally by iter_data_records instead.
+        if not kwargs.get('stream'):
+            response.json = lambda **json_kwargs: decoder(response.content)
+        return response
+
+    client_session.add_response_hook(client, use_decoder)
+
+
+def iter_data_records(chunks, array_key="data"):
+    """
+    Incrementally decode a JSON object, yielding each element of one of its top level arrays as soon as the bytes for
+    that element have arrived.  Only the element being decoded is held in memory.
+    :param chunks: An iterable of bytes. i.e. response.iter_content()
+    :param array_key: The key of the top level array to yield the elements of.
+    :return: A generator of the decoded elements.
+    """
+    scanner = _interning_decoder.raw_decode
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    position = 0
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, position, exhausted
+        # Drop the consumed part of the buffer before growing it.
+        buffer = buffer[position:]
+        position = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += text_decoder.decode(b'', final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
+
+    def next_token():
+        # Returns the next non whitespace character without consuming it, reading more data as needed.
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if exhausted:
+                raise ValueError("Unexpected end of JSON data")
+            read_more()
+
+    def next_value():
+        # Decode the value at position.  A value is only known to be complete once the character following it has
+        # arrived. i.e. a number at the end of the buffer may continue in the next chunk.
+        nonlocal position
+        next_token()
+        while True:
+            try:
+                value, end = scanner(buffer, position)
+                if exhausted or (end < len(buffer) and buffer[end] in VALUE_TERMINATORS):
+                    position = end
+                    return value
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            # Each failed attempt is retried only once the available data has doubled, so a value spanning many chunks
+            # is parsed a logarithmic number of times rather than once per chunk.
+            available = len(buffer) - position
+            while not exhausted and len(buffer) - position < 2 * available:
+                read_more()
+
+    def expect(characters):
+        nonlocal position
+        token = next_token()
+        if token not in characters:
+            raise ValueError("Expected one of '{}' but found '{}'".format(characters, token))
+        position += 1
+        return token
+
+    expect('{')
+    if next_token() == '}':
+        return
+    while True:
+        key = next_value()
+        expect(':')
+        if key == array_key and next_token() == '[':
+            expect('[')
+            if next_token() == ']':
+                position += 1
+            else:
+                while True:
+                    yield next_value()
+                    if expect(',]') == ']':
+                        break
+        else:
+            # Skip the other top level values. i.e. "meta" and "links"
+            next_value()
+        if expect(',}') == '}':
+            return
+
+
+def stream_records(client, resource_path, params=None, page_size=STREAM_PAGE_SIZE):
+    """
+    Fetch every record of a paginated Jama listing, decoding each page incrementally as it downloads.
+    :param client: The JamaClient
+    :param resource_path: The resource to list. i.e. 'relationships'
+    :param params: Optional dict of query parameters. i.e. {'project': 123}
+    :param page_size: The number of records requested per page.
+    :return: A generator of record dicts.
+    """
+    core = client_session.get_core(client)
+    start_at = 0
+    while True:
+        page_params = dict(params or {})
+        page_params['startAt'] = start_at
+        page_params['maxResults'] = page_size
+        response = core.get(resource_path, params=page_params, stream=True)
+        try:
+            response.raise_for_status()
+            records_in_page = 0
+            for record in iter_data_records(response.iter_content(STREAM_CHUNK_SIZE)):
+                records_in_page += 1
+                yield record
+        finally:
+            response.close()
+
+        if records_in_page < page_size:
+            return
+        start_at += records_in_page
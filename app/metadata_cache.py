@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+
+"""
+This file contains a background cache of the Jama reference data (projects, item types, pick lists and users) that
+almost every script needs.  The cache is warmed as soon as the client settings are known, so that a script does not
+have to wait on these calls after the user clicks Execute.
+"""
+
+logger = logging.getLogger('py_jama_script_runner.metadata_cache')
+
+
+class UnsupportedCategoryError(Exception):
+    """Raised when accessing a category that the installed py-jama-rest-client can not fetch."""
+    pass
+
+
+def connection_key(url, username, password, use_oauth):
+    """
+    Returns a value identifying a set of connection settings.  The password is hashed so that the key, which is handed
+    to scripts and used as a dictionary key, never holds it in plain text.
+    """
+    return url, username, hashlib.sha256(password.encode('utf-8')).hexdigest(), use_oauth
+
+
+class MetadataIndex:
+    """
+    A read only collection of Jama resources indexed by id and by name.
+    """
+
+    def __init__(self, resources, name_of):
+        """
+        :param resources: The list of resource dicts returned by the JamaClient.
+        :param name_of: A function that returns the display name of a resource.
+        """
+        self.resources = resources
+        self.by_id = {}
+        self.by_name = {}
+        for resource in resources:
+            self.by_id[resource.get('id')] = resource
+            try:
+                self.by_name.setdefault(name_of(resource), resource)
+            except (KeyError, TypeError):
+                pass
+
+    def all(self):
+        return self.resources
+
+    def get(self, resource_id, default=None):
+        return self.by_id.get(resource_id, default)
+
+    def find(self, name, default=None):
+        return self.by_name.get(name, default)
+
+    def __iter__(self):
+        return iter(self.resources)
+
+    def __len__(self):
+        return len(self.resources)
+
+
+class MetadataSnapshot:
+    """
+    The metadata fetched for a single connection.  Each category is fetched concurrently; accessing a category blocks
+    only until that category has been fetched, and raises if fetching it failed.  A category the client does not
+    support raises UnsupportedCategoryError.
+    """
+
+    def __init__(self, connection_key, categories):
+        self.connection_key = connection_key
+        self._client_future = Future()
+        self._futures = {category: Future() for category in categories}
+
+    @property
+    def client(self):
+        """The JamaClient used to fetch this snapshot, waiting for the connection to be made if needed."""
+        return self._client_future.result()
+
+    def get(self, category, timeout=None):
+        """
+        Get the index for a category, waiting for it to be fetched if needed.
+        :param category: One of the MetadataCache.CATEGORIES keys. i.e. "projects"
+        :param timeout: Optional number of seconds to wait.
+        :return: A MetadataIndex
+        """
+        return self._futures[category].result(timeout)
+
+    @property
+    def projects(self):
+        return self.get('projects')
+
+    @property
+    def item_types(self):
+        return self.get('item_types')
+
+    @property
+    def pick_lists(self):
+        return self.get('pick_lists')
+
+    @property
+    def users(self):
+        return self.get('users')
+
+    def is_ready(self):
+        return all(future.done() for future in self._futures.values())
+
+    def connection_failed(self):
+        future = self._client_future
+        return future.done() and future.exception() is not None
+
+    def failed_categories(self):
+        """Returns the categories whose fetch failed. Categories the client does not support are not included."""
+        failed = []
+        for category, future in list(self._futures.items()):
+            if future.done() and future.exception() is not None \
+                    and not isinstance(future.exception(), UnsupportedCategoryError):
+                failed.append(category)
+        return failed
+
+
+class MetadataCache:
+    """
+    Holds the metadata snapshot for the current connection.  A new snapshot is fetched whenever the connection
+    settings change; otherwise the existing snapshot is reused, and only the categories that failed are fetched again.
+    """
+
+    # Category name: (JamaClient method name, function returning the name used for the by_name index)
+    CATEGORIES = {
+        'projects': ('get_projects', lambda project: project['fields']['name']),
+        'item_types': ('get_item_types', lambda item_type: item_type['display']),
+        'pick_lists': ('get_pick_lists', lambda pick_list: pick_list['name']),
+        'users': ('get_users', lambda user: user['username']),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def connect(self, connection_key, client_factory):
+        """
+        Start prefetching metadata for a connection unless a usable snapshot for it already exists.
+        :param connection_key: A value identifying the connection settings, as returned by connection_key().
+        :param client_factory: A function taking no arguments that returns a connected JamaClient. It is called on a
+            background thread.
+        :return: The MetadataSnapshot for this connection.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.connection_key == connection_key \
+                    and not snapshot.connection_failed():
+                # Fetch again only the categories that failed, with the client that fetched the others.
+                for category in snapshot.failed_categories():
+                    snapshot._futures[category] = Future()
+                    threading.Thread(target=MetadataCache.__fetch_category,
+                                     args=(snapshot, snapshot.client, category),
+                                     daemon=True).start()
+                return snapshot
+
+            snapshot = MetadataSnapshot(connection_key, MetadataCache.CATEGORIES.keys())
+            self._snapshot = snapshot
+
+        threading.Thread(target=self.__prefetch, args=(snapshot, client_factory), daemon=True).start()
+        return snapshot
+
+    def invalidate(self):
+        """Drop the current snapshot so that the next connect() fetches fresh metadata."""
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self):
+        """Returns the current MetadataSnapshot or None if no connection has been made."""
+        return self._snapshot
+
+    @staticmethod
+    def __prefetch(snapshot, client_factory):
+        try:
+            client = client_factory()
+        except Exception as e:
+            logger.warning("Metadata prefetch could not connect: {}".format(e))
+            snapshot._client_future.set_exception(e)
+            for future in snapshot._futures.values():
+                future.set_exception(e)
+            return
+        snapshot._client_future.set_result(client)
+
+        # Fetch each category on its own thread so that no category waits on another.
+        for category in MetadataCache.CATEGORIES.keys():
+            threading.Thread(target=MetadataCache.__fetch_category,
+                             args=(snapshot, client, category),
+                             daemon=True).start()
+
+    @staticmethod
+    def __fetch_category(snapshot, client, category):
+        method_name, name_of = MetadataCache.CATEGORIES.get(category)
+        future = snapshot._futures.get(category)
+        if not hasattr(client, method_name):
+            # Older versions of py-jama-rest-client, such as 1.12.1, have no get_users.
+            future.set_exception(UnsupportedCategoryError("The installed py-jama-rest-client can not fetch {}: it has "
+                                                          "no JamaClient.{}".format(category, method_name)))
+            return
+        try:
+            resources = getattr(client, method_name)()
+            future.set_result(MetadataIndex(resources, name_of))
+        except Exception as e:
+            logger.warning("Metadata prefetch of {} failed: {}".format(category, e))
+            future.set_exception(e)
@@ -0,0 +1,112 @@
+import bisect
+
+"""
+This file contains an index over the options of a selection widget that supports fast, case insensitive type-ahead
+filtering by prefix and by substring, so that widgets stay responsive with tens of thousands of options.
+"""
+
+
+class OptionIndex:
+    """
+    An immutable index of (label, value) options.  Build it off the UI thread; searching it is cheap.
+    """
+
+    # Length of the substrings indexed for substring search.
+    GRAM_SIZE = 3
+
+    def __init__(self, options):
+        """
+        :param options: A list of options. Each option is either a label string, or a (label, value) tuple.
+        """
+        pairs = []
+        for option in options:
+            if isinstance(option, (tuple, list)):
+                label, value = option
+            else:
+                label, value = option, option
+            pairs.append((str(label), value))
+
+        # Options sharing a label, i.e. two projects with the same name, are told apart by their value.
+        values_by_label = {}
+        for label, value in pairs:
+            values = values_by_label.setdefault(label, [])
+            if value not in values:
+                values.append(value)
+
+        self.labels = []
+        self.values = {}
+        for label, value in pairs:
+            if len(values_by_label[label]) > 1:
+                label = "{} ({})".format(label, value)
+            if label in self.values:
+                # The same option listed twice, or a label that is still not unique.
+                if self.values[label] == value:
+                    continue
+                label = "{} #{}".format(label, len(self.labels) + 1)
+            self.labels.append(label)
+            self.values[label] = value
+
+        self.__folded = [label.casefold() for label in self.labels]
+
+        # Sorted folded labels for prefix search.
+        self.__sorted = sorted(range(len(self.labels)), key=lambda position: self.__folded[position])
+        self.__sorted_keys = [self.__folded[position] for position in self.__sorted]
+
+        # Map of every GRAM_SIZE long substring to the positions of the labels containing it.
+        self.__grams = {}
+        for position, folded in enumerate(self.__folded):
+            for gram in {folded[i:i + OptionIndex.GRAM_SIZE] for i in range(len(folded) - OptionIndex.GRAM_SIZE + 1)}:
+                self.__grams.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def value_of(self, label, default=None):
+        return self.values.get(label, default)
+
+    def search(self, text, limit=200):
+        """
+        Find the labels matching the text. Labels starting with the text are listed first (alphabetically), followed by
+        the other labels containing the text (in option order).
+        :param text: The text typed by the user.
+        :param limit: The maximum number of labels to return.
+        :return: A list of labels
+        """
+        text = text.casefold()
+        if text == '':
+            return self.labels[:limit]
+
+        results = []
+        seen = set()
+
+        # Prefix matches are a contiguous run of the sorted keys.
+        start = bisect.bisect_left(self.__sorted_keys, text)
+        for sorted_position in range(start, len(self.__sorted_keys)):
+            if len(results) >= limit or not self.__sorted_keys[sorted_position].startswith(text):
+                break
+            position = self.__sorted[sorted_position]
+            results.append(self.labels[position])
+            seen.add(position)
+
+        # Substring matches.
+        for position in self.__substring_candidates(text):
+            if len(results) >= limit:
+                break
+            if position not in seen and text in self.__folded[position]:
+                results.append(self.labels[position])
+        return results
+
+    def __substring_candidates(self, text):
+        if len(text) < OptionIndex.GRAM_SIZE:
+            return range(len(self.labels))
+
+        # Any label containing the text contains all of its grams, so only the labels in the shortest posting list of
+        # the text's grams need to be checked.
+        shortest = None
+        for i in range(len(text) - OptionIndex.GRAM_SIZE + 1):
+            postings = self.__grams.get(text[i:i + OptionIndex.GRAM_SIZE])
+            if postings is None:
+                return []
+            if shortest is None or len(postings) < len(shortest):
+                shortest = postings
+        return shortest
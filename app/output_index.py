@@ -0,0 +1,381 @@
+import bisect
+import logging
+import re
+import threading
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+"""
+This file contains an index over every message emitted by a script, so that the output can be searched and filtered
+even when it is far larger than what the Results panel displays.  Messages are stored in fixed size blocks; a block is
+joined into a single string once it is full, so that a search over it is a single C level scan instead of a Python
+loop over its messages.
+"""
+
+# Number of messages per block.
+BLOCK_SIZE = 16384
+
+# Shortest literal of a regular expression used to find the messages worth running the expression on.
+MIN_REQUIRED_LITERAL = 3
+
+# Number of characters at the start of a block used to estimate how many of its messages contain a literal.
+LITERAL_SAMPLE_SIZE = 65536
+
+# Largest character range of a regular expression checked for upper case characters before lower casing it.
+MAX_FOLDED_RANGE = 1024
+
+
+def _required_literals(pattern):
+    """
+    Returns the runs of literal characters that every match of a compiled regular expression contains.  Only the top
+    level of the expression is examined, so a literal is never inside an optional or repeated part.
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, TypeError):
+        return []
+    literals = []
+    run = []
+    for op, value in list(parsed) + [(None, None)]:
+        if op == sre_parse.LITERAL and chr(value) != '\n':
+            run.append(chr(value))
+            continue
+        if len(run) >= MIN_REQUIRED_LITERAL:
+            literals.append(''.join(run))
+        run = []
+    return literals
+
+
+def _folded_pattern(query):
+    """
+    Returns the lower cased regular expression if it matches the lower cased text exactly as the original matches the
+    original text ignoring case, otherwise None.  This is the case when only literal characters change and every
+    literal of the result is lower case; escapes such as \\D, \\x45 and ranges such as [A-Z] rule it out.
+    """
+    folded_query = query.lower()
+    try:
+        if re.compile(query).flags != re.compile(folded_query).flags:
+            return None
+        folded_parsed = sre_parse.parse(folded_query)
+        if _fold_literals(sre_parse.parse(query)) != _fold_literals(folded_parsed):
+            return None
+    except (re.error, TypeError):
+        return None
+    for op, value in _operations(folded_parsed):
+        if op is sre_parse.LITERAL or op is sre_parse.NOT_LITERAL:
+            characters = [chr(value)]
+        elif op is sre_parse.RANGE:
+            if value[1] - value[0] > MAX_FOLDED_RANGE:
+                return None
+            characters = [chr(code) for code in range(value[0], value[1] + 1)]
+        else:
+            continue
+        if any(character != character.lower() for character in characters):
+            return None
+    return folded_query
+
+
+def _fold_literals(node):
+    # Converts a parsed regular expression to nested tuples with its literal characters lower cased.
+    if isinstance(node, sre_parse.SubPattern):
+        node = node.data
+    if isinstance(node, (list, tuple)):
+        if len(node) == 2 and (node[0] is sre_parse.LITERAL or node[0] is sre_parse.NOT_LITERAL):
+            return node[0], chr(node[1]).lower()
+        return tuple(_fold_literals(item) for item in node)
+    return node
+
+
+def _operations(node):
+    # Generates every (operation, value) pair of a parsed regular expression, at any depth.
+    if isinstance(node, sre_parse.SubPattern):
+        node = node.data
+    if isinstance(node, (list, tuple)):
+        if len(node) == 2 and isinstance(node[0], type(sre_parse.LITERAL)):
+            yield node
+        for item in node:
+            yield from _operations(item)
+
+
+def _matches_beyond_message(pattern):
+    """
+    Returns True if the regular expression can behave differently on a message inside a block than on the message on
+    its own: lookarounds can see the neighbouring messages, \\A and \\Z only match at the ends of the block, and atomic
+    groups and possessive repeats do not give back a line break they consumed.  Such expressions are run on each
+    message separately.
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, TypeError):
+        return True
+    unsafe = {sre_parse.ASSERT, sre_parse.ASSERT_NOT,
+              getattr(sre_parse, 'ATOMIC_GROUP', None), getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+    for op, value in _operations(parsed):
+        if op in unsafe:
+            return True
+        if op is sre_parse.AT and value in (sre_parse.AT_BEGINNING_STRING, sre_parse.AT_END_STRING):
+            return True
+    return False
+
+
+class _Block:
+    """A block of consecutive messages and their levels and tags."""
+
+    def __init__(self):
+        self.messages = []
+        self.levels = []
+        self.tags = []
+        # Built by seal()
+        self.text = None
+        self.starts = None
+        self.folded_text = None
+        self.folded_starts = None
+        self.positions_by_level = None
+        self.positions_by_tag = None
+
+    def seal(self):
+        """Build the searchable text of the block. The block must not change afterwards."""
+        self.text, self.starts = _Block.__join(self.messages)
+        # Lower casing can change the length of a message, so the folded text has its own offsets.
+        self.folded_text, self.folded_starts = _Block.__join([message.lower() for message in self.messages])
+        self.positions_by_level = _Block.__positions_by_value(self.levels)
+        self.positions_by_tag = _Block.__positions_by_value(self.tags)
+        return self
+
+    def folded_message(self, position):
+        end = self.folded_starts[position + 1] - 1 if position + 1 < len(self.folded_starts) else len(self.folded_text)
+        return self.folded_text[self.folded_starts[position]:end]
+
+    def copy_sealed(self):
+        """Returns a sealed copy of a block that is still being appended to."""
+        block = _Block()
+        block.messages = list(self.messages)
+        block.levels = list(self.levels)
+        block.tags = list(self.tags)
+        return block.seal()
+
+    @staticmethod
+    def __join(messages):
+        starts = []
+        offset = 0
+        for message in messages:
+            starts.append(offset)
+            offset += len(message) + 1
+        return "\n".join(messages), starts
+
+    @staticmethod
+    def __positions_by_value(values):
+        positions = {}
+        for position, value in enumerate(values):
+            positions.setdefault(value, []).append(position)
+        return positions
+
+
+class MessageIndex:
+    """
+    An append only index of emitted messages.  Appending and searching are safe from any thread, and a search does not
+    block appends.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._sealed = []
+            self._current = _Block()
+            self._count = 0
+            self.tags = set()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, message, level=logging.INFO, tag=None):
+        """
+        Add a message to the index.
+        :return: The id of the message. Ids are consecutive, starting at 0.
+        """
+        with self._lock:
+            block = self._current
+            block.messages.append(message)
+            block.levels.append(level)
+            block.tags.append(tag)
+            if tag is not None:
+                self.tags.add(tag)
+            message_id = self._count
+            self._count += 1
+            if len(block.messages) >= BLOCK_SIZE:
+                self._sealed.append(block.seal())
+                self._current = _Block()
+            return message_id
+
+    def get(self, message_id):
+        """Returns the (message, level, tag) of a message id."""
+        block_number, position = divmod(message_id, BLOCK_SIZE)
+        with self._lock:
+            block = self._sealed[block_number] if block_number < len(self._sealed) else self._current
+            return block.messages[position], block.levels[position], block.tags[position]
+
+    def get_range(self, start, end):
+        """Returns the messages with ids from start up to, not including, end."""
+        return [self.get(message_id)[0] for message_id in range(max(start, 0), min(end, self._count))]
+
+    def search(self, query, regex=False, ignore_case=True, levels=None, tag=None, limit=None, cancelled=None):
+        """
+        Find the messages matching a query.
+        :param query: The text to search for. An empty query matches every message.
+        :param regex: If True the query is a regular expression. Raises re.error if it is invalid.
+        :param ignore_case: If True matching is case insensitive.
+        :param levels: Optional collection of logging levels; only messages with one of these levels match.
+        :param tag: Optional tag; only messages with this tag match.
+        :param limit: Optional maximum number of ids to return.
+        :param cancelled: Optional function returning True when the search should be abandoned.
+        :return: A list of matching message ids in ascending order.
+        """
+        # Searches run over a snapshot of the blocks, so appends can continue meanwhile.
+        with self._lock:
+            blocks = list(self._sealed)
+            if self._current.messages:
+                blocks.append(self._current.copy_sealed())
+
+        # Case insensitive searches run over the lower cased text.  A regular expression whose only upper case
+        # characters are literals matches the lower cased text, once lower cased itself, exactly as it would match the
+        # original text ignoring case, and runs far faster than with re.IGNORECASE.
+        pattern = None
+        folded = ignore_case
+        if regex:
+            # MULTILINE lets ^ and $ match at the start and end of each message.
+            folded_query = _folded_pattern(query) if ignore_case else None
+            if ignore_case and folded_query is None:
+                pattern = re.compile(query, re.MULTILINE | re.IGNORECASE)
+                folded = False
+            else:
+                pattern = re.compile(folded_query if ignore_case else query, re.MULTILINE)
+        elif ignore_case:
+            query = query.lower()
+
+        # A regular expression is only run on the messages containing one of its required literals, when it has any.
+        # The literal is found with a plain text scan, which is far faster than running the expression over the block.
+        literals = []
+        literals_folded = folded
+        each_message = False
+        if pattern is not None:
+            each_message = _matches_beyond_message(pattern)
+            literals = _required_literals(pattern)
+            if pattern.flags & re.IGNORECASE:
+                literals = [literal.lower() for literal in literals]
+                literals_folded = True
+
+        matches = []
+        for block_number, block in enumerate(blocks):
+            if cancelled is not None and cancelled():
+                break
+            first_id = block_number * BLOCK_SIZE
+            candidates = MessageIndex.__filter_candidates(block, levels, tag)
+            if literals:
+                containing = MessageIndex.__literal_candidates(block, literals, literals_folded)
+                if containing is not None:
+                    candidates = containing if candidates is None else sorted(set(candidates).intersection(containing))
+            if candidates is None and each_message:
+                candidates = range(len(block.messages))
+            if candidates is None:
+                positions = MessageIndex.__search_block(block, query, pattern, folded)
+            else:
+                positions = MessageIndex.__search_candidates(block, candidates, query, pattern, folded)
+            for position in positions:
+                if levels is not None and block.levels[position] not in levels:
+                    continue
+                if tag is not None and block.tags[position] != tag:
+                    continue
+                matches.append(first_id + position)
+                if limit is not None and len(matches) >= limit:
+                    return matches
+        return matches
+
+    @staticmethod
+    def __filter_candidates(block, levels, tag):
+        """
+        Returns the sorted positions of the messages passing the level and tag filters, or None when scanning the whole
+        block would be faster than checking the candidates one by one.
+        """
+        if levels is None and tag is None:
+            return None
+        candidates = None
+        if levels is not None:
+            candidates = set()
+            for level in levels:
+                candidates.update(block.positions_by_level.get(level, []))
+        if tag is not None:
+            tagged = block.positions_by_tag.get(tag, [])
+            candidates = set(tagged) if candidates is None else candidates.intersection(tagged)
+        if len(candidates) * 8 > len(block.messages):
+            return None
+        return sorted(candidates)
+
+    @staticmethod
+    def __literal_candidates(block, literals, folded):
+        """
+        Returns the sorted positions of the messages containing the rarest of the literals, or None when it is in so
+        many messages that scanning the whole block would be faster than checking them one by one.
+        """
+        text, starts = (block.folded_text, block.folded_starts) if folded else (block.text, block.starts)
+        # Estimate how common each literal is from the start of the block; counting over the whole block would cost as
+        # much as scanning it.
+        sample_end = min(len(text), LITERAL_SAMPLE_SIZE)
+        sample_messages = bisect.bisect_right(starts, sample_end)
+        count, literal = min((text.count(literal, 0, sample_end), literal) for literal in literals)
+        # Checking a message costs far more than scanning past it, so only rare literals are worth it.
+        if count * 32 > sample_messages:
+            return None
+        positions = []
+        found = text.find(literal)
+        while found >= 0:
+            position = bisect.bisect_right(starts, found) - 1
+            positions.append(position)
+            if position + 1 >= len(starts):
+                break
+            found = text.find(literal, starts[position + 1])
+        return positions
+
+    @staticmethod
+    def __search_candidates(block, candidates, query, pattern, folded):
+        """Generates the positions of the candidate messages matching the query."""
+        for position in candidates:
+            message = block.folded_message(position) if folded else block.messages[position]
+            if pattern is not None:
+                if pattern.search(message) is not None:
+                    yield position
+            elif query in message:
+                yield position
+
+    @staticmethod
+    def __search_block(block, query, pattern, folded):
+        """Generates the positions within the block of the messages matching the query."""
+        if pattern is None and query == '':
+            yield from range(len(block.messages))
+            return
+
+        text, starts = (block.folded_text, block.folded_starts) if folded else (block.text, block.starts)
+        offset = 0
+        while True:
+            if pattern is not None:
+                match = pattern.search(text, offset)
+                found = match.start() if match is not None else -1
+            else:
+                found = text.find(query, offset)
+            if found < 0:
+                return
+            position = bisect.bisect_right(starts, found) - 1
+            # A match over the whole block may run on into the next message, so check it against its own message.
+            if pattern is not None or '\n' in query:
+                yield from MessageIndex.__search_candidates(block, [position], query, pattern, folded)
+            else:
+                yield position
+            # Continue from the next message so each message is reported once.
+            if position + 1 >= len(starts):
+                return
+            offset = starts[position + 1]
@@ -1,11 +1,14 @@
 # Python standard libs
+import collections
 import datetime
 import os
 import sys
 import threading
+import time
 import queue
 import logging
 import configparser
+import re
 
 # External Library imports
 import tkinter as tk
@@ -20,6 +23,12 @@ from py_jama_rest_client.client import JamaClient
 
 # Local imports:
 import custom_widgets as cw
+import json_decoding
+import telemetry
+from output_index import MessageIndex
+import run_history
+from cassette import Cassette, RECORD_MODE, REPLAY_MODE
+from metadata_cache import MetadataCache, connection_key
 
 # Constant / lookup value imports
 import colors
@@ -31,6 +40,11 @@ RADIO_BUTTON_FIELD_WIDGET = "RADIO_BUTTON_FIELD_WIDGET"
 DIRECTORY_CHOOSER_FIELD_WIDGET = "DIRECTORY_CHOOSER_FIELD_WIDGET"
 FILE_CHOOSER_FIELD_WIDGET = "FILE_CHOOSER_FIELD_WIDGET"
 COMBOBOX_FIELD_WIDGET = "COMBOBOX_FIELD_WIDGET"
+INPUT_FILE_FIELD_WIDGET = "INPUT_FILE_FIELD_WIDGET"
+SERVER_COMBOBOX_FIELD_WIDGET = "SERVER_COMBOBOX_FIELD_WIDGET"
+
+# Optional keys of an INPUT_FILE_FIELD_WIDGET config that are passed on to the InputFileReader
+INPUT_FILE_READER_OPTIONS = ["column_types", "chunk_size", "file_format", "encoding", "skip_invalid"]
 
 # local logger
 logger = logging.getLogger('py_jama_script_runner')
@@ -47,7 +61,9 @@ class PyJamaScriptRunner(tk.Tk):
         :param custom_widgets: This is a dict of desired custom widgets, each Key Value pair will be passed as kwargs to
             the run function later
         :param func_to_run: This should be a function that takes **kwargs as its only parameter.  then the keys from the
-            custom widgets dict will be passed to this function with the corresponding gathered values.
+            custom widgets dict will be passed to this function with the corresponding gathered values.  The kwargs
+            will also contain a "client" and a "metadata" snapshot of prefetched projects, item types, pick lists and
+            users.
         """
         # Initialize Tk application
         tk.Tk.__init__(self)
@@ -56,10 +72,23 @@ class PyJamaScriptRunner(tk.Tk):
         self.target = func_to_run
         self.script_running = False
         self.message_queue = queue.Queue()
+        self.message_index = MessageIndex()
         self.work_thread = None
         self.progress = tk.DoubleVar()
         self.status = tk.StringVar(value="Ready")
         self.custom_fields = {}
+        # Fields whose values are never recorded in the run history
+        self.secret_fields = {field for field, field_config in custom_widgets.items()
+                              if field_config.get('secret') or run_history.is_secret(field)}
+        self.script_name = "{}:{}".format(os.path.basename(sys.argv[0]),
+                                          getattr(func_to_run, '__qualname__', str(func_to_run)))
+        self.run_history = None
+        self.metadata_cache = MetadataCache()
+        self.telemetry = telemetry.Telemetry(queue_depth=lambda: self.message_queue.qsize())
+        self.show_telemetry = tk.BooleanVar(value=False)
+        self.cassette = None
+        self.cassette_mode = tk.StringVar(value="")
+        self.replay_latency = tk.BooleanVar(value=False)
 
         # Set the title of the application
         self.title(const.TITLE)
@@ -75,9 +104,30 @@ class PyJamaScriptRunner(tk.Tk):
         self.file_menu = tk.Menu(self.menubar, tearoff=0)
         self.file_menu.add_command(label="Load settings", command=self.load_settings)
         self.file_menu.add_command(label="Save settings", command=self.save_settings)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="Refresh metadata", command=self.refresh_metadata)
         self.menubar.add_cascade(label="File", menu=self.file_menu)
+        self.view_menu = tk.Menu(self.menubar, tearoff=0)
+        self.view_menu.add_checkbutton(label=const.TELEMETRY_MENU_LABEL, variable=self.show_telemetry,
+                                       command=self.toggle_telemetry_panel)
+        self.view_menu.add_command(label=const.RUN_HISTORY_MENU_LABEL, command=self.show_run_history)
+        self.menubar.add_cascade(label="View", menu=self.view_menu)
+        self.cassette_menu = tk.Menu(self.menubar, tearoff=0)
+        self.cassette_menu.add_radiobutton(label=const.CASSETTE_OFF_LABEL, variable=self.cassette_mode, value="",
+                                           command=self.change_cassette_mode)
+        self.cassette_menu.add_radiobutton(label=const.CASSETTE_RECORD_LABEL, variable=self.cassette_mode,
+                                           value=RECORD_MODE, command=self.change_cassette_mode)
+        self.cassette_menu.add_radiobutton(label=const.CASSETTE_REPLAY_LABEL, variable=self.cassette_mode,
+                                           value=REPLAY_MODE, command=self.change_cassette_mode)
+        self.cassette_menu.add_separator()
+        self.cassette_menu.add_checkbutton(label=const.CASSETTE_REPLAY_LATENCY_LABEL, variable=self.replay_latency,
+                                           command=self.change_replay_latency)
+        self.menubar.add_cascade(label=const.CASSETTE_MENU_LABEL, menu=self.cassette_menu)
         self.config(menu=self.menubar)
 
+        # Close any open cassette file when the window is closed
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Setup client connection settings frame
         self.client_panel = ClientSettingsPanel(self)
 
@@ -87,18 +137,22 @@ class PyJamaScriptRunner(tk.Tk):
         # Setup Script Output Section
         self.results_panel = ResultsPanel(self)
 
+        # Setup the Telemetry Section. It is hidden until enabled from the View menu.
+        self.telemetry_panel = TelemetryPanel(self)
+
         # Setup Execute Button
         self.execute_panel = ExecutePanel(self)
 
         # Setup Status / Progress bar
         self.status_frame = StatusPanel(self)
 
-        # Pack the application.
+        # Pack the application. The bottom panels are packed before the Results so that the Telemetry panel sits
+        # next to the Results only.
         self.client_panel.pack(fill=tkc.X)
         self.script_settings_panel.pack(fill=tkc.X)
-        self.results_panel.pack(fill=tkc.BOTH, expand=1)
         self.status_frame.pack(side=tkc.BOTTOM, fill=tkc.X)
         self.execute_panel.pack(side=tkc.BOTTOM, fill=tkc.X)
+        self.results_panel.pack(fill=tkc.BOTH, expand=1)
 
         # attempt to load existing settings.iml file
         self.default_settings_file = 'settings.ini'
@@ -113,6 +167,12 @@ class PyJamaScriptRunner(tk.Tk):
         config_path = os.path.join(self.application_path, self.default_settings_file)
         self.load_file(config_path)
 
+        # Open the run history
+        try:
+            self.run_history = run_history.RunHistory(os.path.join(self.application_path, const.RUN_HISTORY_FILE))
+        except Exception as e:
+            print(e)
+
         # INIT LOGGING
         log_dir = self.application_path
         try:
@@ -171,6 +231,92 @@ class PyJamaScriptRunner(tk.Tk):
                 if option in self.custom_fields:
                     self.custom_fields.get(option).set_value(config.get("CUSTOM_FIELDS", option, fallback=""))
 
+        # Start warming the metadata cache with the loaded client settings.
+        self.prefetch_metadata()
+
+    def prefetch_metadata(self):
+        """
+        Starts fetching the Jama metadata in the background using the current client settings. Nothing is done if the
+        credentials have not been entered yet, or if the metadata for these settings is already cached.
+        :return: None
+        """
+        connection_settings = self.client_panel.get_connection_settings()
+        url, username, password, use_oauth = connection_settings
+        if username == '' or password == '':
+            return
+        client_cassette = self.cassette
+        metadata = self.metadata_cache.connect(connection_key(*connection_settings),
+                                               lambda: ClientSettingsPanel.create_client(*connection_settings,
+                                                                                         cassette=client_cassette))
+        self.load_server_options(metadata)
+
+    def load_server_options(self, metadata):
+        """Starts loading the options of every server populated field for the connection of the metadata snapshot."""
+        for field_widget in self.custom_fields.values():
+            if isinstance(field_widget, cw.ServerComboBoxFieldWidget):
+                field_widget.load_options(metadata)
+
+    def refresh_metadata(self):
+        """Discards the cached metadata and fetches it again."""
+        self.metadata_cache.invalidate()
+        self.prefetch_metadata()
+
+    def change_cassette_mode(self):
+        """
+        Switches between the live server, recording to a cassette file and replaying from one.  Clients connected after
+        the switch use the new mode.
+        :return: None
+        """
+        mode = self.cassette_mode.get()
+        path = ''
+        if mode == RECORD_MODE:
+            path = filedialog.asksaveasfilename(initialdir=self.application_path,
+                                                title="Record to cassette",
+                                                filetypes=(("Cassette files", "*.jsonl.gz"), ("all files", "*")),
+                                                defaultextension=".jsonl.gz")
+        elif mode == REPLAY_MODE:
+            path = filedialog.askopenfilename(initialdir=self.application_path,
+                                              title="Replay cassette",
+                                              filetypes=(("Cassette files", "*.jsonl.gz"), ("all files", "*")))
+
+        # Stop using the previous cassette
+        if self.cassette is not None:
+            self.cassette.close()
+            self.cassette = None
+
+        title = const.TITLE
+        if mode != '' and path:
+            try:
+                self.cassette = Cassette(path, mode, replay_latency=self.replay_latency.get())
+                title = "{} [{}: {}]".format(const.TITLE, mode.capitalize(), os.path.basename(path))
+            except Exception as e:
+                self.logger.error(e)
+                messagebox.showerror("Unable to open cassette", str(e))
+        if self.cassette is None:
+            self.cassette_mode.set("")
+        self.title(title)
+
+        # Cached metadata came from a client using the previous mode.
+        self.metadata_cache.invalidate()
+        self.prefetch_metadata()
+
+    def on_close(self):
+        if self.cassette is not None:
+            self.cassette.close()
+        self.destroy()
+
+    def change_replay_latency(self):
+        if self.cassette is not None:
+            self.cassette.replay_latency = self.replay_latency.get()
+
+    def toggle_telemetry_panel(self):
+        """Shows or hides the Telemetry panel to the right of the Results panel."""
+        if self.show_telemetry.get():
+            self.telemetry_panel.pack(side=tkc.RIGHT, fill=tkc.Y, before=self.results_panel)
+            self.telemetry_panel.refresh()
+        else:
+            self.telemetry_panel.pack_forget()
+
     def execute_button_command(self):
         """This function should start a thread to do the work of the custom script. The script can pass back messages
         via a message queue."""
@@ -184,47 +330,90 @@ class PyJamaScriptRunner(tk.Tk):
         self.message_queue = queue.Queue()
 
         # Clear out Results page:
+        self.message_index.clear()
         self.results_panel.clear()
 
         # Parse arguments
         try:
             kwargs = self.get_form_params()
+            history_parameters = self.get_history_params()
 
         except Exception as e:
             # If error during parameter parsing and validation, then reset running vars and button state to normal
             self.logger.error(e)
+            self.set_status_message(str(e))
             self.script_running = False
             self.execute_panel.execute_button.configure(state=tkc.NORMAL)
             return
 
+        # Start measuring this run
+        self.telemetry.reset()
+        self.telemetry.instrument(kwargs.get("client"))
+
         # Start messaging queue reader
         self.after(100, func=self.__periodic_message_queue_handler)
 
         # Create New Thread and start our script functionality in it.
         self.work_thread = threading.Thread(
-            target=self.target,
-            kwargs=kwargs,  # A Dictionary of named arguments for the target function
+            target=self.__run_script,
+            args=(kwargs, history_parameters),  # The named arguments for the target and the parameters to record
             daemon=True
         )
+        self.telemetry.watch_thread(self.work_thread)
         self.work_thread.start()
 
         # Begin periodic thread completion check.
         self.after(300, func=self.__periodic_check_work_thread_completed)
 
+    def __run_script(self, kwargs, history_parameters):
+        """
+        Runs the target function on the work thread and records the run in the run history.
+        :param kwargs: The named arguments for the target function.
+        :param history_parameters: The parameters to record for this run.
+        :return: None
+        """
+        started_at = datetime.datetime.now()
+        start = time.monotonic()
+        outcome = run_history.SUCCESS_OUTCOME
+        error = None
+        try:
+            self.target(**kwargs)
+        except Exception as e:
+            outcome = run_history.ERROR_OUTCOME
+            error = str(e)
+            raise
+        finally:
+            wall_time = time.monotonic() - start
+            self.telemetry.sample_memory()
+            if self.run_history is not None:
+                try:
+                    self.run_history.record_run(self.script_name, started_at, history_parameters, wall_time,
+                                                requests=self.telemetry.requests,
+                                                bytes_sent=self.telemetry.bytes_sent,
+                                                bytes_received=self.telemetry.bytes_received,
+                                                memory_growth=self.telemetry.memory_growth(),
+                                                outcome=outcome,
+                                                error=error)
+                except Exception as e:
+                    logger.warning("Unable to record run history: {}".format(e))
+
     def __periodic_message_queue_handler(self):
         """
         This method will periodically check the message queue and add any queued messages to the Results Panel.
         :return:
         """
-        # Get all messages out of the queue.
-        while not self.message_queue.empty():
+        # Get the queued messages out of the queue, a limited number at a time so that the GUI stays responsive.
+        messages = []
+        while len(messages) < ResultsPanel.MAX_MESSAGES_PER_UPDATE:
             try:
-                self.results_panel.append_message(self.message_queue.get())
+                messages.append(self.message_queue.get_nowait())
             except queue.Empty:
-                pass
+                break
+        if messages:
+            self.results_panel.append_messages(messages)
 
-        # As long as the script is still running we must keep re-scheduling this task.
-        if self.script_running:
+        # As long as the script is still running, or messages remain, we must keep re-scheduling this task.
+        if self.script_running or not self.message_queue.empty():
             self.after(40, func=self.__periodic_message_queue_handler)
 
     def __periodic_check_work_thread_completed(self):
@@ -234,28 +423,66 @@ class PyJamaScriptRunner(tk.Tk):
         :return:
         """
         if self.work_thread.is_alive():
+            # Sample the memory use for the run's peak memory
+            self.telemetry.sample_memory()
             # If the thread is still active, do nothing right now. and reschedule this method
             self.after(500, func=self.__periodic_check_work_thread_completed)
         else:
             # Set running status to false to signal the end of the Message queue manager
             self.script_running = False
+            logger.info("Run telemetry: " + telemetry.format_snapshot(self.telemetry.snapshot()))
+            if self.cassette is not None:
+                self.cassette.flush()
             # Set the Execute button to normal state so that it can be used again.
             self.execute_panel.execute_button.config(state=tkc.NORMAL)
 
     def get_form_params(self):
+        client = self.client_panel.get_client(cassette=self.cassette)
+        connection_settings = self.client_panel.get_connection_settings()
+        client_cassette = self.cassette
         kwargs = {
-            "client": self.client_panel.get_client()
+            "client": client,
+            # Reuses the prefetched metadata unless the connection settings have changed since it was fetched.  The
+            # metadata is fetched with a client of its own, so that its requests are not counted as the script's.
+            "metadata": self.metadata_cache.connect(connection_key(*connection_settings),
+                                                    lambda: ClientSettingsPanel.create_client(*connection_settings,
+                                                                                              cassette=client_cassette))
         }
+        self.load_server_options(kwargs["metadata"])
 
         for custom_field in self.custom_fields.keys():
-            kwargs[custom_field] = self.custom_fields.get(custom_field).get_value()
+            kwargs[custom_field] = self.custom_fields.get(custom_field).get_param()
 
         return kwargs
 
-    def emit_message(self, msg):
-        self.message_queue.put(msg)
-        self.message_queue.put("\n")
-        logger.info(msg)
+    def get_history_params(self):
+        """
+        Returns the parameters recorded in the run history: the Jama URL and the custom field values, without secrets.
+        """
+        parameters = {"jama_url": self.client_panel.url_field.get_value()}
+        for custom_field in self.custom_fields.keys():
+            if custom_field not in self.secret_fields:
+                parameters[custom_field] = self.custom_fields.get(custom_field).get_value()
+        return parameters
+
+    def show_run_history(self):
+        if self.run_history is None:
+            messagebox.showerror("Run history unavailable", "The run history database could not be opened.")
+            return
+        RunHistoryWindow(self)
+
+    def emit_message(self, msg, level=logging.INFO, tag=None):
+        """
+        Display a message in the Results panel and write it to the log.
+        :param msg: The message
+        :param level: Optional logging level of the message. i.e. logging.WARNING
+        :param tag: Optional string used to filter the messages in the Results panel search.
+        :return: None
+        """
+        message = str(msg)
+        message_id = self.message_index.append(message, level, tag)
+        self.message_queue.put((message_id, message))
+        logger.log(level, msg)
 
     def set_status_message(self, msg):
         self.status.set(msg)
@@ -270,6 +497,12 @@ class PyJamaScriptRunner(tk.Tk):
 
 
 class ResultsPanel(tk.LabelFrame):
+    # Maximum number of messages kept in the Results panel. Older messages can still be found with the search bar.
+    MAX_DISPLAYED_MESSAGES = 20000
+
+    # Maximum number of messages added to the Results panel per update.
+    MAX_MESSAGES_PER_UPDATE = 5000
+
     def __init__(self, master):
         # Init LabelFrame superclass
         tk.LabelFrame.__init__(self, master, text=const.RESULT_PANEL_LABEL, bg=colors.JAMA_HILO_SILVER)
@@ -277,31 +510,400 @@ class ResultsPanel(tk.LabelFrame):
         # Set parent reference
         self.parent = master
 
+        # The text line each displayed message starts on, by message id.  Line numbers count the lines deleted from
+        # the top of the Text widget, so they do not change as old messages are removed.
+        self.displayed_lines = collections.OrderedDict()
+        self.deleted_lines = 0
+
+        # While showing search matches only, new messages are indexed but not displayed.
+        self.filtering = False
+
+        # Add a search bar
+        self.search_bar = SearchBar(self)
+
         # Add a Text widget to display results.  Set it to disabled so that the User may not interact with it.
         self.result_text = Text(self, state=tkc.DISABLED, background=colors.JAMA_HILO_SILVER)
         # self.result_text.bind("<Key>", lambda e: "break")
         self.result_text.bind('<Button-1>', lambda e: self.result_text.config(state=tkc.NORMAL))
         self.result_text.bind('<ButtonRelease-1>', lambda e: self.result_text.config(state=tkc.DISABLED))
+        self.result_text.tag_configure(SearchBar.MATCH_TAG, background=colors.JAMA_MOONSHOT_GOLD)
 
         # Add a scrollbar for results
         self.result_scrollbar = ttk.Scrollbar(self, orient=tkc.VERTICAL, command=self.result_text.yview)
         self.result_text.configure(yscrollcommand=self.result_scrollbar.set)
 
         # Pack the Widget
+        self.search_bar.pack(side=tkc.TOP, fill=tkc.X)
         self.result_scrollbar.pack(side=tkc.RIGHT, fill=tkc.Y)
         self.result_text.pack(fill=tkc.BOTH, expand=tkc.TRUE)
 
     def append_message(self, msg):
-        self.result_text.configure(state=tkc.NORMAL)
-        self.result_text.insert(tkc.END, msg)
+        """
+        Index and display a single message.  Kept for scripts that write to the Results panel directly; scripts should
+        use emit_message() instead.
+        """
+        # Messages used to carry their own line break; each message is now displayed on its own line.
+        if msg.endswith('\n'):
+            msg = msg[:-1]
+        message_id = self.parent.message_index.append(msg)
+        self.append_messages([(message_id, msg)])
+
+    def append_messages(self, messages):
+        """
+        Display messages from the message queue, removing the oldest displayed messages beyond MAX_DISPLAYED_MESSAGES.
+        :param messages: A list of (message id, message) tuples.
+        :return: None
+        """
+        if self.filtering:
+            return
+        self.__insert_messages(messages)
         self.result_text.see(tkc.END)
+
+    def __insert_messages(self, messages):
+        line = int(self.result_text.index('end-1c').split('.')[0]) + self.deleted_lines
+        for message_id, message in messages:
+            self.displayed_lines[message_id] = line
+            line += message.count('\n') + 1
+
+        self.result_text.configure(state=tkc.NORMAL)
+        self.result_text.insert(tkc.END, ''.join(message + '\n' for message_id, message in messages))
+
+        # Remove the oldest messages
+        if len(self.displayed_lines) > ResultsPanel.MAX_DISPLAYED_MESSAGES:
+            while len(self.displayed_lines) > ResultsPanel.MAX_DISPLAYED_MESSAGES:
+                self.displayed_lines.popitem(last=False)
+            first_line = next(iter(self.displayed_lines.values()))
+            self.result_text.delete('1.0', '{}.0'.format(first_line - self.deleted_lines))
+            self.deleted_lines = first_line - 1
         self.result_text.configure(state=tkc.DISABLED)
 
-    def clear(self):
+    def jump_to(self, message_id):
+        """
+        Scroll to and highlight a displayed message.
+        :return: True if the message is displayed, False if it is no longer displayed.
+        """
+        line = self.displayed_lines.get(message_id)
+        if line is None:
+            return False
+        message = self.parent.message_index.get(message_id)[0]
+        start = '{}.0'.format(line - self.deleted_lines)
+        end = '{}.0'.format(line - self.deleted_lines + message.count('\n') + 1)
+        self.result_text.tag_remove(SearchBar.MATCH_TAG, '1.0', tkc.END)
+        self.result_text.tag_add(SearchBar.MATCH_TAG, start, end)
+        self.result_text.see(start)
+        return True
+
+    def show_messages(self, message_ids):
+        """Display only the given messages. Used to show the matches of a search."""
+        self.filtering = True
+        self.__clear_text()
+        index = self.parent.message_index
+        message_ids = message_ids[:ResultsPanel.MAX_DISPLAYED_MESSAGES]
+        self.__insert_messages([(message_id, index.get(message_id)[0]) for message_id in message_ids])
+
+    def show_latest_messages(self):
+        """Display the latest messages again after showing the matches of a search."""
+        self.filtering = False
+        self.__clear_text()
+        index = self.parent.message_index
+        end = len(index)
+        start = max(0, end - ResultsPanel.MAX_DISPLAYED_MESSAGES)
+        self.__insert_messages(list(zip(range(start, end), index.get_range(start, end))))
+        self.result_text.see(tkc.END)
+
+    def __clear_text(self):
+        self.displayed_lines.clear()
+        self.deleted_lines = 0
         self.result_text.configure(state=tkc.NORMAL)
         self.result_text.delete('1.0', tkc.END)
         self.result_text.configure(state=tkc.DISABLED)
 
+    def clear(self):
+        self.filtering = False
+        self.search_bar.reset()
+        self.__clear_text()
+
+
+class SearchBar(tk.Frame):
+    """
+    This bar searches all the messages emitted by the script, including those no longer displayed in the Results
+    panel.  Searches run on a background thread against the runner's message index.
+    """
+
+    # Text tag used to highlight the current match
+    MATCH_TAG = "search_match"
+
+    # Maximum number of matches collected by a search.  No more than this can be shown with "show matches only", and
+    # stopping here keeps searches with very many matches fast.
+    MAX_MATCHES = ResultsPanel.MAX_DISPLAYED_MESSAGES
+
+    # Level filter label: logging levels shown
+    LEVELS = collections.OrderedDict([
+        ("All", None),
+        ("Info", {logging.INFO}),
+        ("Warning", {logging.WARNING}),
+        ("Error", {logging.ERROR, logging.CRITICAL}),
+    ])
+
+    def __init__(self, master: ResultsPanel):
+        tk.Frame.__init__(self, master, bg=colors.JAMA_HILO_SILVER)
+
+        # Set parent reference
+        self.parent = master
+
+        # Search state
+        self.matches = []
+        self.current_match = -1
+        self.search_generation = 0
+        self.search_result = None
+
+        # Create the search inputs
+        self.query = tk.StringVar(self, "")
+        self.use_regex = tk.BooleanVar(self, False)
+        self.match_case = tk.BooleanVar(self, False)
+        self.level = tk.StringVar(self, "All")
+        self.tag = tk.StringVar(self, "")
+        self.show_matches_only = tk.BooleanVar(self, False)
+        self.search_status = tk.StringVar(self, "")
+
+        self.query_label = ttk.Label(self, text=const.SEARCH_LABEL, background=colors.JAMA_HILO_SILVER)
+        self.query_entry = ttk.Entry(self, textvariable=self.query, width=30)
+        self.query_entry.bind('<Return>', lambda e: self.search())
+        self.regex_checkbutton = tk.Checkbutton(self, text=const.SEARCH_REGEX_LABEL, variable=self.use_regex,
+                                                background=colors.JAMA_HILO_SILVER)
+        self.match_case_checkbutton = tk.Checkbutton(self, text=const.SEARCH_MATCH_CASE_LABEL,
+                                                     variable=self.match_case, background=colors.JAMA_HILO_SILVER)
+        self.level_label = ttk.Label(self, text=const.SEARCH_LEVEL_LABEL, background=colors.JAMA_HILO_SILVER)
+        self.level_combo_box = ttk.Combobox(self, textvariable=self.level, values=list(SearchBar.LEVELS.keys()),
+                                            width=8, state="readonly")
+        self.tag_label = ttk.Label(self, text=const.SEARCH_TAG_LABEL, background=colors.JAMA_HILO_SILVER)
+        self.tag_combo_box = ttk.Combobox(self, textvariable=self.tag, width=12, state="readonly",
+                                          postcommand=self.update_tags)
+        self.search_button = ttk.Button(self, text=const.SEARCH_BUTTON_TEXT, command=self.search)
+        self.previous_button = ttk.Button(self, text=const.SEARCH_PREVIOUS_BUTTON_TEXT, width=2,
+                                          command=lambda: self.move_to_match(-1))
+        self.next_button = ttk.Button(self, text=const.SEARCH_NEXT_BUTTON_TEXT, width=2,
+                                      command=lambda: self.move_to_match(1))
+        self.filter_checkbutton = tk.Checkbutton(self, text=const.SEARCH_FILTER_LABEL,
+                                                 variable=self.show_matches_only, command=self.update_filter,
+                                                 background=colors.JAMA_HILO_SILVER)
+        self.status_label = ttk.Label(self, textvariable=self.search_status, background=colors.JAMA_HILO_SILVER)
+
+        # Pack the frame
+        for widget in (self.query_label, self.query_entry, self.regex_checkbutton, self.match_case_checkbutton,
+                       self.level_label, self.level_combo_box, self.tag_label, self.tag_combo_box, self.search_button,
+                       self.previous_button, self.next_button, self.filter_checkbutton, self.status_label):
+            widget.pack(side=tkc.LEFT)
+
+    def update_tags(self):
+        self.tag_combo_box.configure(values=[""] + sorted(self.parent.parent.message_index.tags))
+
+    def search(self):
+        """Starts a search with the current inputs on a background thread."""
+        self.search_generation += 1
+        generation = self.search_generation
+        self.search_result = None
+        self.search_status.set("Searching...")
+
+        query_args = (self.query.get(),)
+        query_kwargs = {
+            "regex": self.use_regex.get(),
+            "ignore_case": not self.match_case.get(),
+            "levels": SearchBar.LEVELS.get(self.level.get()),
+            "tag": self.tag.get() or None,
+            "limit": SearchBar.MAX_MATCHES,
+            # Abandon this search if another one is started.
+            "cancelled": lambda: generation != self.search_generation,
+        }
+        threading.Thread(target=self.__run_search, args=(generation, query_args, query_kwargs), daemon=True).start()
+        self.after(20, self.__periodic_check_search, generation)
+
+    def __run_search(self, generation, query_args, query_kwargs):
+        try:
+            self.search_result = (generation, self.parent.parent.message_index.search(*query_args, **query_kwargs))
+        except re.error as e:
+            self.search_result = (generation, e)
+
+    def __periodic_check_search(self, generation):
+        if generation != self.search_generation:
+            return
+        if self.search_result is None or self.search_result[0] != generation:
+            self.after(20, self.__periodic_check_search, generation)
+            return
+
+        result = self.search_result[1]
+        if isinstance(result, Exception):
+            self.search_status.set("Invalid regex: {}".format(result))
+            return
+        self.matches = result
+        self.current_match = -1
+        if self.show_matches_only.get():
+            self.parent.show_messages(self.matches)
+        self.move_to_match(1)
+
+    def move_to_match(self, step):
+        """Jumps to the next (step=1) or previous (step=-1) match."""
+        if not self.matches:
+            self.search_status.set("No matches")
+            return
+        self.current_match = (self.current_match + step) % len(self.matches)
+        count = "{:,}{}".format(len(self.matches), "+" if len(self.matches) >= SearchBar.MAX_MATCHES else "")
+        status = "{:,} of {}".format(self.current_match + 1, count)
+        if not self.parent.jump_to(self.matches[self.current_match]):
+            status += " (no longer displayed; check \"{}\")".format(const.SEARCH_FILTER_LABEL)
+        self.search_status.set(status)
+
+    def update_filter(self):
+        if self.show_matches_only.get():
+            self.parent.show_messages(self.matches)
+            if self.matches:
+                self.move_to_match(0 if self.current_match >= 0 else 1)
+        else:
+            self.parent.show_latest_messages()
+
+    def reset(self):
+        self.search_generation += 1
+        self.matches = []
+        self.current_match = -1
+        self.show_matches_only.set(False)
+        self.search_status.set("")
+
+
+class TelemetryPanel(tk.LabelFrame):
+    """
+    This panel displays live performance metrics of the running script.
+    """
+
+    # Milliseconds between refreshes of the displayed metrics.
+    REFRESH_INTERVAL = 1000
+
+    # Metric label: (snapshot key, function formatting the value)
+    METRICS = [
+        ("Requests/sec:", "requests_per_second", lambda value: "{:.1f}".format(value)),
+        ("Latency p50:", "latency_p50", lambda value: "{:.0f} ms".format(value * 1000)),
+        ("Latency p95:", "latency_p95", lambda value: "{:.0f} ms".format(value * 1000)),
+        ("In flight:", "in_flight", str),
+        ("Requests:", "requests", str),
+        ("Rate limited:", "rate_limited", str),
+        ("Queue depth:", "queue_depth", str),
+        ("Worker CPU:", "worker_cpu_percent", lambda value: "{:.0f} %".format(value)),
+        ("Memory (RSS):", "rss_bytes", lambda value: "{:.1f} MB".format(value / 1024 / 1024)),
+    ]
+
+    def __init__(self, master):
+        tk.LabelFrame.__init__(self, master, text=const.TELEMETRY_PANEL_LABEL, bg=colors.JAMA_HILO_SILVER)
+
+        # Set parent reference
+        self.parent = master
+
+        # Create a label for each metric
+        self.metric_values = {}
+        for row, (label_text, key, value_format) in enumerate(TelemetryPanel.METRICS):
+            label = ttk.Label(self, text=label_text, anchor=tkc.E, background=colors.JAMA_HILO_SILVER)
+            value = tk.StringVar(self, "-")
+            value_label = ttk.Label(self, textvariable=value, width=10, anchor=tkc.W,
+                                    background=colors.JAMA_HILO_SILVER)
+            label.grid(row=row, column=0, sticky=tkc.E)
+            value_label.grid(row=row, column=1, sticky=tkc.W)
+            self.metric_values[key] = value
+
+        # The scheduled refresh, so that showing the panel again does not start a second refresh loop.
+        self.refresh_job = None
+
+    def refresh(self):
+        """Displays the current metrics and reschedules itself while the panel is shown."""
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        if not self.parent.show_telemetry.get():
+            return
+        metrics = self.parent.telemetry.snapshot()
+        for label_text, key, value_format in TelemetryPanel.METRICS:
+            value = metrics.get(key)
+            self.metric_values[key].set("-" if value is None else value_format(value))
+        self.refresh_job = self.after(TelemetryPanel.REFRESH_INTERVAL, self.refresh)
+
+
+class RunHistoryWindow(tk.Toplevel):
+    """
+    This window lists the previous runs of the script, highlighting runs that were slower or used more resources than
+    the runs before them.
+    """
+
+    # Column id: heading
+    COLUMNS = collections.OrderedDict([
+        ("started_at", "Started"),
+        ("outcome", "Outcome"),
+        ("wall_time", "Wall time"),
+        ("requests", "Requests"),
+        ("bytes_received", "Received"),
+        ("memory_growth", "Memory growth"),
+        ("comparison", "Compared to previous runs"),
+        ("parameters", "Parameters"),
+    ])
+
+    # Tag of the rows of regressed runs
+    REGRESSION_TAG = "regression"
+
+    def __init__(self, master):
+        tk.Toplevel.__init__(self, master, bg=colors.JAMA_HILO_SILVER)
+        self.title("{}: {}".format(const.RUN_HISTORY_TITLE, master.script_name))
+
+        # Set parent reference
+        self.parent = master
+
+        # Create a table of runs
+        self.run_tree = ttk.Treeview(self, columns=list(RunHistoryWindow.COLUMNS.keys()), show="headings")
+        for column, heading in RunHistoryWindow.COLUMNS.items():
+            self.run_tree.heading(column, text=heading)
+        self.run_tree.tag_configure(RunHistoryWindow.REGRESSION_TAG, background=colors.JAMA_MOONSHOT_GOLD)
+        self.run_scrollbar = ttk.Scrollbar(self, orient=tkc.VERTICAL, command=self.run_tree.yview)
+        self.run_tree.configure(yscrollcommand=self.run_scrollbar.set)
+
+        self.refresh_button = ttk.Button(self, text=const.RUN_HISTORY_REFRESH_BUTTON_TEXT, command=self.refresh)
+
+        # Pack the window
+        self.refresh_button.pack(side=tkc.BOTTOM, anchor=tkc.E)
+        self.run_scrollbar.pack(side=tkc.RIGHT, fill=tkc.Y)
+        self.run_tree.pack(fill=tkc.BOTH, expand=tkc.TRUE)
+
+        self.refresh()
+
+    def refresh(self):
+        self.run_tree.delete(*self.run_tree.get_children())
+        runs = self.parent.run_history.get_runs(self.parent.script_name)
+        for run, comparison in zip(runs, run_history.compare_runs(runs)):
+            regressed = [metric for metric, (ratio, is_regression) in comparison.items() if is_regression]
+            outcome = run.get("outcome")
+            if run.get("error") is not None:
+                outcome = "{}: {}".format(outcome, run.get("error"))
+            values = [
+                run.get("started_at"),
+                outcome,
+                RunHistoryWindow.__format_value(run.get("wall_time"), "{:.1f} s"),
+                RunHistoryWindow.__format_value(run.get("requests"), "{:,}"),
+                RunHistoryWindow.__format_bytes(run.get("bytes_received")),
+                RunHistoryWindow.__format_bytes(run.get("memory_growth")),
+                RunHistoryWindow.__format_comparison(run, comparison, regressed),
+                ", ".join("{}={}".format(name, value) for name, value in run.get("parameters").items()),
+            ]
+            self.run_tree.insert('', tkc.END, values=values,
+                                 tags=(RunHistoryWindow.REGRESSION_TAG,) if regressed else ())
+
+    @staticmethod
+    def __format_value(value, value_format):
+        return "" if value is None else value_format.format(value)
+
+    @staticmethod
+    def __format_comparison(run, comparison, regressed):
+        if run.get("outcome") != run_history.SUCCESS_OUTCOME:
+            return "Not compared: the run failed"
+        return ", ".join("{} {:.1f}x".format(metric.replace('_', ' '), comparison[metric][0]) for metric in regressed)
+
+    @staticmethod
+    def __format_bytes(value):
+        return "" if value is None else "{:.1f} MB".format(value / 1024 / 1024)
+
 
 class ExecutePanel(tk.Frame):
     """
@@ -366,6 +968,10 @@ class ScriptSettingsPanel(tk.LabelFrame):
                     field_widget = cw.StringFieldWidget(self, field_label)
                 elif field_type == FILE_CHOOSER_FIELD_WIDGET:
                     field_widget = cw.FileChooserFieldWidget(self, field_label)
+                elif field_type == INPUT_FILE_FIELD_WIDGET:
+                    reader_options = {option: field_config.get(option) for option in INPUT_FILE_READER_OPTIONS
+                                      if option in field_config}
+                    field_widget = cw.InputFileFieldWidget(self, field_label, reader_options)
                 elif field_type == DIRECTORY_CHOOSER_FIELD_WIDGET:
                     field_widget = cw.DirectoryChooserFieldWidget(self, field_label)
                 elif field_type == RADIO_BUTTON_FIELD_WIDGET:
@@ -374,6 +980,9 @@ class ScriptSettingsPanel(tk.LabelFrame):
                 elif field_type == COMBOBOX_FIELD_WIDGET:
                     options = field_config.get('options')
                     field_widget = cw.ComboBoxFieldWidget(self, field_label, options)
+                elif field_type == SERVER_COMBOBOX_FIELD_WIDGET:
+                    options_loader = field_config.get('options')
+                    field_widget = cw.ServerComboBoxFieldWidget(self, field_label, options_loader)
                 field_widget.pack(fill=tkc.X)
                 custom_fields[field] = field_widget
             except Exception as e:
@@ -404,13 +1013,62 @@ class ClientSettingsPanel(tk.LabelFrame):
         self.username_field = cw.StringFieldWidget(self, const.USERNAME)
         self.password_field = cw.StringFieldWidget(self, const.PASSWORD, show='*')
 
+        # Start prefetching metadata once the user has finished entering their credentials.
+        self.password_field.entry.bind('<FocusOut>', lambda e: self.parent.prefetch_metadata())
+
         # Pack the Frame
         self.url_field.pack(fill=tkc.X)
         self.auth_mode_field.pack(fill=tkc.X)
         self.username_field.pack(fill=tkc.X)
         self.password_field.pack(fill=tkc.X)
 
-    def get_client(self):
+    def get_connection_settings(self):
+        """
+        Reads in the values in the Client Settings panel and validates the fields.  i.e. trim whitespace; add https://
+        to url fields missing it.
+        :return: A tuple of (url, username, password, use_oauth)
+        """
+        # Read values
+        url = self.url_field.value.get().strip().lower()
+        # Get those pesky backslashes out
+        while url.endswith('/') and url != 'https://' and url != 'http://':
+            url = url[0:len(url) - 1]
+        # If http or https method not specified in the url then add it now.
+        if not (url.startswith('https://') or url.startswith('http://')):
+            url = 'https://' + url
+        self.url_field.value.set(url)
+
+        if self.auth_mode_field.auth_mode.get() == AuthModeSelector.AUTH_MODE_BASIC:
+            use_oauth = False
+        else:
+            use_oauth = True
+        username = self.username_field.value.get().strip()
+        password = self.password_field.value.get().strip()
+        return url, username, password, use_oauth
+
+    @staticmethod
+    def create_client(url, username, password, use_oauth, cassette=None):
+        """
+        Create a JamaClient instance and attempt to make a connection to it.  This does not touch any widgets so it
+        is safe to call from a background thread.
+        :param cassette: Optional Cassette to record the client's requests to, or replay them from.
+        :return: The connected JamaClient
+        """
+        # A replayed client must not fetch an OAuth token from the network.
+        if cassette is not None and cassette.mode == REPLAY_MODE:
+            use_oauth = False
+        # Create the client
+        jama_client = JamaClient(url, credentials=(username, password), oauth=use_oauth)
+        # Decode responses with the fastest available JSON decoder
+        json_decoding.install_decoder(jama_client)
+        if cassette is not None:
+            cassette.install(jama_client)
+        # Attempt a connection
+        jama_client.get_available_endpoints()
+        # No Exception?  ok it will probably work; return the client.
+        return jama_client
+
+    def get_client(self, cassette=None):
         """This method does the following:
             1) Reads in the values in the Client Settings panel
             2) Validates the fields.  i.e. trim whitespace; add https:// to url fields missing it.
@@ -418,28 +1076,7 @@ class ClientSettingsPanel(tk.LabelFrame):
             4) Returns the new JamaClient. or None if
         """
         try:
-            # Read values
-            url = self.url_field.value.get().strip().lower()
-            # Get those pesky backslashes out
-            while url.endswith('/') and url != 'https://' and url != 'http://':
-                url = url[0:len(url) - 1]
-            # If http or https method not specified in the url then add it now.
-            if not (url.startswith('https://') or url.startswith('http://')):
-                url = 'https://' + url
-            self.url_field.value.set(url)
-
-            if self.auth_mode_field.auth_mode.get() == AuthModeSelector.AUTH_MODE_BASIC:
-                use_oauth = False
-            else:
-                use_oauth = True
-            username = self.username_field.value.get().strip()
-            password = self.password_field.value.get().strip()
-            # Create the client
-            jama_client = JamaClient(url, credentials=(username, password), oauth=use_oauth)
-            # Attempt a connection
-            jama_client.get_available_endpoints()
-            # No Exception?  ok it will probably work; return the client.
-            return jama_client
+            return ClientSettingsPanel.create_client(*self.get_connection_settings(), cassette=cassette)
 
         except Exception as e:
             messagebox.showerror("Unable to connect", "Please check your client settings.")
@@ -0,0 +1,132 @@
+import contextlib
+import json
+import sqlite3
+import statistics
+import threading
+
+"""
+This file contains a local SQLite store of every script run: its parameters, how long it took, how many requests it
+made, how much data it transferred, how much its memory grew and its outcome.  Runs are compared with the previous runs
+of the same script to spot performance regressions.
+"""
+
+SUCCESS_OUTCOME = "success"
+ERROR_OUTCOME = "error"
+
+# Metrics compared between runs. A higher value is worse for all of them.
+COMPARED_METRICS = ["wall_time", "requests", "bytes_received", "memory_growth"]
+
+# Number of previous successful runs a run is compared with.
+BASELINE_RUNS = 10
+
+# A metric has regressed when it is this many times its baseline (the median of the previous runs).
+REGRESSION_THRESHOLD = 1.2
+
+# Parts of field names that are treated as secrets and never recorded.
+SECRET_FIELD_NAME_PARTS = ["password", "secret", "token"]
+
+
+def is_secret(field_name):
+    field_name = field_name.lower()
+    return any(part in field_name for part in SECRET_FIELD_NAME_PARTS)
+
+
+class RunHistory:
+    """
+    The run history database.  A connection is opened per call so that runs can be recorded from the worker thread.
+    """
+
+    COLUMNS = ["id", "script", "started_at", "parameters", "wall_time", "requests", "bytes_sent", "bytes_received",
+               "memory_growth", "outcome", "error"]
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with self.__connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS runs ("
+                               "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "script TEXT NOT NULL, "
+                               "started_at TEXT NOT NULL, "
+                               "parameters TEXT, "
+                               "wall_time REAL, "
+                               "requests INTEGER, "
+                               "bytes_sent INTEGER, "
+                               "bytes_received INTEGER, "
+                               "memory_growth INTEGER, "
+                               "outcome TEXT, "
+                               "error TEXT)")
+            connection.execute("CREATE INDEX IF NOT EXISTS runs_by_script ON runs (script, id)")
+
+    @contextlib.contextmanager
+    def __connect(self):
+        # Commits on success, and always closes the connection.
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record_run(self, script, started_at, parameters, wall_time, requests=None, bytes_sent=None,
+                   bytes_received=None, memory_growth=None, outcome=SUCCESS_OUTCOME, error=None):
+        """
+        Save a run.
+        :param script: The name identifying the script.
+        :param started_at: The datetime the run started.
+        :param parameters: A dict of the run's parameters. Values are saved as strings; secrets must be removed first.
+        :param wall_time: The run's duration in seconds.
+        :param memory_growth: The run's peak memory minus the memory in use when it started, in bytes.
+        :return: The id of the saved run.
+        """
+        with self._lock, self.__connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (script, started_at, parameters, wall_time, requests, bytes_sent, bytes_received, "
+                "memory_growth, outcome, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (script, started_at.isoformat(sep=' ', timespec='seconds'),
+                 json.dumps(parameters, default=str, sort_keys=True), wall_time, requests, bytes_sent,
+                 bytes_received, memory_growth, outcome, error))
+            return cursor.lastrowid
+
+    def get_runs(self, script, limit=100):
+        """
+        :return: The latest runs of a script as dicts, newest first.
+        """
+        with self.__connect() as connection:
+            rows = connection.execute("SELECT {} FROM runs WHERE script = ? ORDER BY id DESC LIMIT ?"
+                                      .format(", ".join(RunHistory.COLUMNS)), (script, limit)).fetchall()
+        runs = []
+        for row in rows:
+            run = dict(zip(RunHistory.COLUMNS, row))
+            run["parameters"] = json.loads(run.get("parameters") or "{}")
+            runs.append(run)
+        return runs
+
+
+def compare_runs(runs):
+    """
+    Compare each successful run with the median of the previous successful runs of the same script.
+    :param runs: Runs of one script, newest first, as returned by RunHistory.get_runs.
+    :return: A list with one dict per run of metric name to (ratio to the baseline, True if regressed). Metrics without
+        a baseline are left out, and failed runs, which may have stopped early or late, are not compared.
+    """
+    comparisons = []
+    for position, run in enumerate(runs):
+        if run.get("outcome") != SUCCESS_OUTCOME:
+            comparisons.append({})
+            continue
+        previous = [previous_run for previous_run in runs[position + 1:]
+                    if previous_run.get("outcome") == SUCCESS_OUTCOME][:BASELINE_RUNS]
+        comparison = {}
+        for metric in COMPARED_METRICS:
+            value = run.get(metric)
+            baseline_values = [previous_run.get(metric) for previous_run in previous
+                               if previous_run.get(metric) is not None]
+            if value is None or not baseline_values:
+                continue
+            baseline = statistics.median(baseline_values)
+            if baseline <= 0:
+                continue
+            ratio = value / baseline
+            comparison[metric] = (ratio, ratio >= REGRESSION_THRESHOLD)
+        comparisons.append(comparison)
+    return comparisons
@@ -0,0 +1,200 @@
+import collections
+import os
+import threading
+import time
+
+import client_session
+
+"""
+This file contains the runtime performance telemetry of a run: request rate and latency, in flight requests, the
+message queue depth, worker CPU use and process memory.  Metrics are recorded cheaply as requests complete and are only
+summarised when a snapshot is taken, so they can be shown in the GUI or read by a headless run.
+"""
+
+# Optional dependency used to read the process memory on every platform.
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Number of seconds the request rate is averaged over.
+RATE_WINDOW = 10.0
+
+# Shortest window the request rate is averaged over, so that the first requests of a run do not read as a huge rate.
+MIN_RATE_WINDOW = 1.0
+
+# Number of recent request latencies kept for the percentiles.
+LATENCY_SAMPLES = 1000
+
+
+class Telemetry:
+    """
+    Collects the metrics of the requests made by instrumented clients.  Safe to use from any thread.
+    """
+
+    def __init__(self, queue_depth=None):
+        """
+        :param queue_depth: Optional function returning the current depth of the message queue.
+        """
+        self.queue_depth = queue_depth
+        self._lock = threading.Lock()
+        self.worker_thread = None
+        self.reset()
+
+    def reset(self):
+        """Clear all the metrics. Called at the start of each run."""
+        with self._lock:
+            self.started = time.monotonic()
+            self.requests = 0
+            self.errors = 0
+            self.rate_limited = 0
+            self.in_flight = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.peak_rss = 0
+            self.start_rss = process_rss()
+            self._completed_times = collections.deque()
+            self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+            self._last_cpu_sample = None
+
+    def instrument(self, client):
+        """
+        Record the metrics of every request sent by the client.
+        :param client: The JamaClient
+        :return: None
+        """
+        client_session.wrap_send(client, self.__timed_send)
+
+    def watch_thread(self, thread):
+        """Set the worker thread whose CPU use is reported."""
+        self.worker_thread = thread
+
+    def __timed_send(self, send, request, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.bytes_sent += len(request.body or b'')
+        start = time.monotonic()
+        response = None
+        try:
+            response = send(request, **kwargs)
+            return response
+        finally:
+            end = time.monotonic()
+            with self._lock:
+                self.in_flight -= 1
+                self.requests += 1
+                self._completed_times.append(end)
+                self._latencies.append(end - start)
+                if response is None or response.status_code >= 400:
+                    self.errors += 1
+                if response is not None:
+                    if response.status_code == 429:
+                        self.rate_limited += 1
+                    self.bytes_received += Telemetry.__response_size(response, kwargs.get('stream'))
+
+    @staticmethod
+    def __response_size(response, stream):
+        if not stream:
+            return len(response.content or b'')
+        try:
+            return int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            return 0
+
+    def snapshot(self):
+        """
+        Summarise the current metrics.
+        :return: A dict of metric name to value. Values that can not be measured on this platform are None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Drop completions that have left the rate window.
+            while self._completed_times and self._completed_times[0] < now - RATE_WINDOW:
+                self._completed_times.popleft()
+            window = max(MIN_RATE_WINDOW, min(RATE_WINDOW, now - self.started))
+            latencies = sorted(self._latencies)
+            metrics = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "in_flight": self.in_flight,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "requests_per_second": len(self._completed_times) / window,
+                "latency_p50": Telemetry.__percentile(latencies, 0.50),
+                "latency_p95": Telemetry.__percentile(latencies, 0.95),
+            }
+
+        metrics["queue_depth"] = self.queue_depth() if self.queue_depth is not None else None
+        metrics["worker_cpu_percent"] = self.__cpu_percent(now)
+        metrics["rss_bytes"] = self.sample_memory()
+        with self._lock:
+            metrics["peak_rss_bytes"] = self.peak_rss or None
+        return metrics
+
+    def sample_memory(self):
+        """Read the process memory and update the peak. Returns the current memory in bytes, or None."""
+        rss = process_rss()
+        if rss is not None:
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def memory_growth(self):
+        """
+        Returns how far the peak memory rose above the memory in use when the metrics were reset, in bytes, or None.
+        Memory freed by earlier runs is rarely returned to the operating system, so the absolute peak is not comparable
+        between runs.
+        """
+        with self._lock:
+            if self.start_rss is None or self.peak_rss == 0:
+                return None
+            return max(0, self.peak_rss - self.start_rss)
+
+    @staticmethod
+    def __percentile(sorted_values, fraction):
+        if not sorted_values:
+            return None
+        return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+    def __cpu_percent(self, now):
+        # Use the CPU clock of the worker thread where the platform provides one, otherwise the whole process.
+        cpu_time = None
+        thread = self.worker_thread
+        if thread is not None and thread.is_alive() and hasattr(time, 'pthread_getcpuclockid'):
+            try:
+                cpu_time = time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+            except (OSError, TypeError):
+                cpu_time = None
+        if cpu_time is None:
+            cpu_time = time.process_time()
+
+        # CPU use is the CPU time spent between two snapshots over the wall time between them.
+        with self._lock:
+            last_sample = self._last_cpu_sample
+            self._last_cpu_sample = (now, cpu_time)
+        if last_sample is None or now <= last_sample[0] or cpu_time < last_sample[1]:
+            return None
+        return (cpu_time - last_sample[1]) / (now - last_sample[0]) * 100
+
+
+def process_rss():
+    """Returns the resident memory of this process in bytes, or None if it can not be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        # Linux only: the second field of statm is the resident page count.
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def format_snapshot(metrics):
+    """Format a snapshot as a single line for the log."""
+    parts = []
+    for name, value in metrics.items():
+        if isinstance(value, float):
+            value = round(value, 3)
+        parts.append("{}={}".format(name, value))
+    return ", ".join(parts)
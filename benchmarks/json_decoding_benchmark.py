@@ -0,0 +1,117 @@
+"""
+Benchmark of the JSON decoders in app/json_decoding.py against the default decode path of the requests library, on
+large synthetic Jama listing payloads.
+
+Run from the root of the project:
+    python benchmarks/json_decoding_benchmark.py [number of records]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import json_decoding
+
+# Number of times each decode is timed; the best time is reported.
+REPEATS = 5
+
+# Size of the chunks fed to the streaming decoder, matching a streamed response.
+CHUNK_SIZE = json_decoding.STREAM_CHUNK_SIZE
+
+
+def build_payload(record_count):
+    """Builds the body of a Jama items listing with record_count items."""
+    records = []
+    for record_id in range(record_count):
+        records.append({
+            "id": record_id,
+            "documentKey": "PRJ-REQ-{}".format(record_id),
+            "globalId": "GID-{}".format(record_id),
+            "itemType": 89,
+            "project": 20,
+            "createdDate": "2020-01-01T00:00:00.000+0000",
+            "modifiedDate": "2020-01-02T00:00:00.000+0000",
+            "lastActivityDate": "2020-01-02T00:00:00.000+0000",
+            "createdBy": 18,
+            "modifiedBy": 18,
+            "fields": {
+                "documentKey": "PRJ-REQ-{}".format(record_id),
+                "globalId": "GID-{}".format(record_id),
+                "name": "Requirement number {}".format(record_id),
+                "description": "<p>The system shall do thing {} within 100 ms.</p>".format(record_id),
+                "status": 293,
+                "priority": 296,
+            },
+            "resources": {"self": {"allowed": ["GET", "PUT", "PATCH", "DELETE"]}},
+            "location": {
+                "sortOrder": record_id,
+                "globalSortOrder": record_id * 1000,
+                "sequence": "1.{}".format(record_id),
+                "parent": {"item": 100},
+            },
+            "lock": {"locked": False, "lastLockedDate": "2020-01-02T00:00:00.000+0000"},
+            "type": "items",
+        })
+    payload = {
+        "meta": {"status": "OK", "timestamp": "2020-01-02T00:00:00.000+0000",
+                 "pageInfo": {"startIndex": 0, "resultCount": record_count, "totalResults": record_count}},
+        "links": {},
+        "data": records,
+    }
+    return json.dumps(payload).encode('utf-8')
+
+
+def decode_requests_default(content):
+    # requests' Response.json() decodes the body to text and then calls json.loads.
+    return json.loads(content.decode('utf-8'))
+
+
+def decode_streaming(content):
+    chunks = (content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE))
+    # Consume the records one at a time as a script would, without keeping them.
+    count = 0
+    for _ in json_decoding.iter_data_records(chunks):
+        count += 1
+    return count
+
+
+def measure(decode, content):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        decode(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Peak memory is measured in a separate pass as tracing slows decoding down.
+    tracemalloc.start()
+    result = decode(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    content = build_payload(record_count)
+    print("Payload: {:,} records, {:.1f} MB".format(record_count, len(content) / 1024 / 1024))
+
+    candidates = [("requests default", decode_requests_default)]
+    for name, decoder in json_decoding.DECODERS.items():
+        candidates.append((name, decoder))
+    candidates.append(("streaming", decode_streaming))
+
+    baseline = None
+    print("{:<20}{:>12}{:>12}{:>16}".format("decoder", "time (s)", "speedup", "peak mem (MB)"))
+    for name, decode in candidates:
+        elapsed, peak = measure(decode, content)
+        baseline = baseline or elapsed
+        print("{:<20}{:>12.3f}{:>11.2f}x{:>16.1f}".format(name, elapsed, baseline / elapsed, peak / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,10 @@ import app.py_jama_script_runner as pjsr
 # The list of custom widgets we want for our customized script runner app
 custom_widgets = {
     "project_id": {
-        "type": pjsr.STRING_FIELD_WIDGET,
-        "label": "Project ID:"
+        "type": pjsr.SERVER_COMBOBOX_FIELD_WIDGET,
+        "label": "Project:",
+        # Options are loaded from the server. The script receives the id of the chosen project.
+        "options": lambda metadata: [(project['fields']['name'], project['id']) for project in metadata.projects]
     },
     "mapping_version": {
         "type": pjsr.RADIO_BUTTON_FIELD_WIDGET,
@@ -14,12 +16,12 @@ custom_widgets = {
         "options": ["A", "B", "C", "D"]
     },
     "item_type": {
-        "type": pjsr.COMBOBOX_FIELD_WIDGET,
+        "type": pjsr.SERVER_COMBOBOX_FIELD_WIDGET,
         "label": "Item Type:",
-        "options": ["Component", "Folder", "Text", "Item"]
+        "options": lambda metadata: [(item_type['display'], item_type['id']) for item_type in metadata.item_types]
     },
     "input_file": {
-        "type": pjsr.FILE_CHOOSER_FIELD_WIDGET,
+        "type": pjsr.INPUT_FILE_FIELD_WIDGET,
         "label": "Input File:"
     },
     "output_location": {
@@ -61,22 +63,19 @@ class CustomizedApp:
                 self.app.emit_message("Unable to locate argument {}.".format(custom_field_name))
 
         if client is not None:
-            self.get_projects(client)
+            self.get_projects(kwargs.get('metadata'))
 
-    def get_projects(self, client):
-        # Create the JamaClient
-        jama_client = client
-
-        # Get the list of projects from Jama
-        # The client will return to us a JSON array of Projects, where each project is a JSON object.
-        project_list = jama_client.get_projects()
+    def get_projects(self, metadata):
+        # Get the list of projects from the prefetched metadata.  This waits only if the prefetch is still running.
+        # The list contains the JSON array of Projects returned by the client, where each project is a JSON object.
+        project_list = metadata.projects.all()
 
         # Print the data out for each project.
         for index, project in enumerate(project_list):
             self.app.set_status_message("Running: " + str(index) + "/" + str(len(project_list)))
             self.app.update_progress(int(index/len(project_list) * 100))
             project_name = project['fields']['name']
-            self.app.emit_message('\n---------------' + project_name + '---------------')
+            self.app.emit_message('\n---------------' + project_name + '---------------', tag="project")
 
             # Print each field
             for field_name, field_data in project.items():
@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'app'))
+
+import json_decoding
+
+"""
+Round trip tests of the incremental decoder in json_decoding against json.loads.  Run with
+`python -m unittest discover tests` from the repository root.
+"""
+
+DOCUMENTS = [
+    {"meta": {"status": "OK"}, "data": [], "links": {}},
+    {"data": [12345, -1.5e10, 0, 3.25, 1e-7, 9007199254740993]},
+    {"meta": {"pageInfo": {"startIndex": 0}}, "data": [{"id": 1, "fields": {"name": "Café ☃", "n": None}},
+                                                       {"id": 22, "fields": {"name": "a \"quoted\" } ] , name"}},
+                                                       [True, False, None, []], "text", {}],
+     "linked": {"items": {"1": {"id": 1}}}},
+    {"links": [1, 2], "data": [{"nested": {"deeper": [{"id": 123456789}, [[[]]]]}}], "meta": {}},
+    {"meta": {}},
+    {},
+]
+
+
+def chunked(content, chunk_size):
+    return [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+
+class IterDataRecordsTest(unittest.TestCase):
+
+    def assert_round_trip(self, document, content):
+        expected = json.loads(content).get("data", [])
+        for chunk_size in range(1, len(content) + 1):
+            with self.subTest(document=document, chunk_size=chunk_size):
+                records = list(json_decoding.iter_data_records(chunked(content, chunk_size)))
+                self.assertEqual(records, expected)
+
+    def test_round_trip_for_every_chunk_size(self):
+        for document in DOCUMENTS:
+            self.assert_round_trip(document, json.dumps(document).encode('utf-8'))
+
+    def test_round_trip_with_whitespace(self):
+        for document in DOCUMENTS:
+            self.assert_round_trip(document, json.dumps(document, indent=2).encode('utf-8'))
+
+    def test_numbers_split_across_chunks(self):
+        content = b'{"data": [1234567890, -98.765e-3, 42]}'
+        for split in range(1, len(content)):
+            with self.subTest(split=split):
+                records = list(json_decoding.iter_data_records([content[:split], content[split:]]))
+                self.assertEqual(records, [1234567890, -98.765e-3, 42])
+
+    def test_empty_data_array(self):
+        self.assertEqual(list(json_decoding.iter_data_records([b'{"data": [], "meta": {"count": 0}}'])), [])
+        self.assertEqual(list(json_decoding.iter_data_records([b'{"data":[]}'])), [])
+
+    def test_record_larger_than_chunk(self):
+        record = {"fields": {"field{}".format(i): {"value": i, "list": [i, str(i)]} for i in range(5000)}}
+        content = json.dumps({"data": [record, record]}).encode('utf-8')
+        records = list(json_decoding.iter_data_records(chunked(content, 1024)))
+        self.assertEqual(records, [record, record])
+
+    def test_truncated_input(self):
+        content = json.dumps(DOCUMENTS[2]).encode('utf-8')
+        for length in range(len(content)):
+            with self.subTest(length=length):
+                with self.assertRaises(ValueError):
+                    list(json_decoding.iter_data_records(chunked(content[:length], 7)))
+
+    def test_records_yielded_before_input_ends(self):
+        def chunks():
+            yield b'{"data": [{"id": 1}, '
+            raise AssertionError("Read past the first record")
+        self.assertEqual(next(json_decoding.iter_data_records(chunks())), {"id": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import logging
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'app'))
+
+import output_index
+
+"""
+Equivalence tests of MessageIndex.search against running re.search, or a substring test, on every message on its own.
+Run with `python -m unittest discover tests` from the repository root.
+"""
+
+WORDS = ["Processed", "item", "Error", "error", "ERROR", "in", "project", "Requirement", "É", "café", "x45", "E", "",
+         " ", "  ", "\t", "a\nb", "Item\nError", "42", "7", "-", "[x]", "done."]
+
+PATTERNS = [
+    # Literals and escapes
+    r"Error", r"error", r"ERROR", r"\x45rror", r"\x45", r"É", r"café", r"\.", r"\[x\]", r"E\d", r"item 4",
+    # Character classes
+    r"[A-Z]tem", r"[a-z]tem", r"[\x41-\x5a]\w+", r"[^a-z ]", r"[^\n]E", r"\D\d", r"\W\w", r"[Ee]rror \d+",
+    # Whitespace and matches at message boundaries
+    r"\d\sE", r"\d\s", r"\s$", r"^\s", r"\s+\S", r"m\s+E", r"d\nE", r"b\nI", r"[^x]\n",
+    # Anchors
+    r"^Error", r"^error", r"Error$", r"^$", r"^.{0,3}$", r"\Aitem", r"item\Z", r"\bin\b", r"\Bro",
+    # Lookarounds
+    r"(?<!o)r", r"(?<=\d)\s", r"r(?!o)", r"item(?= \d)", r"(?<![a-z])E",
+    # Alternation, groups and repeats
+    r"Error|Requirement", r"(item|project) \d+", r"(?:in )?item", r"(\w)\1", r"(?i)ERROR", r"e.*e", r"^(?:\S+ )+\S+$",
+]
+
+if sys.version_info >= (3, 11):
+    PATTERNS += [r"(?>\s+)E", r"\s*+$", r"\w++\d"]
+
+SUBSTRINGS = ["Error", "error", "É", "é", "m 4", "\nE", "d\nE", "2\nE", " ", "item", "ITEM"]
+
+
+class MessageIndexSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        # Small blocks, so that the messages span many sealed blocks and one that is still being appended to.
+        self.block_size = output_index.BLOCK_SIZE
+        output_index.BLOCK_SIZE = 64
+
+        rng = random.Random(7)
+        self.messages = []
+        self.index = output_index.MessageIndex()
+        for message_number in range(1000):
+            message = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+            if message_number % 3 == 0:
+                message = "{} {}".format(message, message_number)
+            level = rng.choice([logging.INFO, logging.WARNING, logging.ERROR])
+            tag = rng.choice([None, "a", "b"])
+            self.messages.append((message, level, tag))
+            self.index.append(message, level, tag)
+
+    def tearDown(self):
+        output_index.BLOCK_SIZE = self.block_size
+
+    def expected(self, matches, levels=None, tag=None):
+        return [message_id for message_id, (message, level, message_tag) in enumerate(self.messages)
+                if matches(message) and (levels is None or level in levels) and (tag is None or message_tag == tag)]
+
+    def test_regex_matches_each_message_on_its_own(self):
+        for pattern in PATTERNS:
+            for ignore_case in (True, False):
+                flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+                compiled = re.compile(pattern, flags)
+                for levels, tag in ((None, None), ({logging.ERROR}, None), (None, "a")):
+                    with self.subTest(pattern=pattern, ignore_case=ignore_case, levels=levels, tag=tag):
+                        self.assertEqual(self.index.search(pattern, regex=True, ignore_case=ignore_case,
+                                                           levels=levels, tag=tag),
+                                         self.expected(lambda message: compiled.search(message) is not None,
+                                                       levels, tag))
+
+    def test_substring_matches_each_message_on_its_own(self):
+        for query in SUBSTRINGS:
+            for ignore_case in (True, False):
+                with self.subTest(query=query, ignore_case=ignore_case):
+                    if ignore_case:
+                        expected = self.expected(lambda message: query.lower() in message.lower())
+                    else:
+                        expected = self.expected(lambda message: query in message)
+                    self.assertEqual(self.index.search(query, ignore_case=ignore_case), expected)
+
+    def test_matches_do_not_run_into_the_next_message(self):
+        index = output_index.MessageIndex()
+        for number in range(200):
+            index.append("Processed item {}".format(number) if number % 2 == 0 else "Error in item {}".format(number))
+        self.assertEqual(index.search(r"\d\sE", regex=True), [])
+        self.assertEqual(index.search("0\nE"), [])
+
+    def test_escaped_upper_case_ignoring_case(self):
+        index = output_index.MessageIndex()
+        index.append("Error in item 1")
+        index.append("error two")
+        self.assertEqual(index.search(r"\x45rror", regex=True, ignore_case=True), [0, 1])
+
+    def test_limit(self):
+        expected = self.expected(lambda message: "e" in message.lower())
+        self.assertEqual(self.index.search("e", limit=10), expected[:10])
+
+
+if __name__ == '__main__':
+    unittest.main()